@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+# =====================================================================================
+# BỘ ĐO HIỆU NĂNG CHO CHẾ ĐỘ CẤU TRÚC VÀ TRỰC QUAN
+# Tạo PDF tổng hợp (tất định theo seed) với nhiều hình dạng: chữ dày, chữ thưa, trang scan.
+# Mỗi lần chạy một chế độ nằm trong một tiến trình con riêng với engine dịch "stub" offline
+# và bộ nhớ dịch trống, để số đo (trang/giây, cụm từ/giây, thời gian từng giai đoạn,
+# RSS đỉnh, dung lượng file ra) so sánh được giữa các commit.
+#
+#   python benchmarks/bench_pipeline.py --pages 10 100 --shapes dense sparse scanned --output bench.json
+# =====================================================================================
+
+WORDS = ("system manual translation page document section figure table value result "
+         "process method data model error input output network server client user option "
+         "parameter configuration install update version release support chapter appendix").split()
+SHAPES = {"dense": 45, "sparse": 6, "scanned": 45}  # số dòng chữ mỗi trang
+SCAN_DPI = 150
+
+
+def make_synthetic_pdf(path, shape, pages, seed=1):
+    rng = random.Random(f"{seed}-{shape}-{pages}")
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=595, height=842)  # A4
+        # Phần lặp lại trên mọi trang (tiêu đề, chân trang) như tài liệu thật
+        page.insert_text((50, 40), "Technical Manual - Chapter 3", fontsize=9)
+        page.insert_text((280, 820), f"Page {page_num + 1}", fontsize=9)
+        for line in range(SHAPES[shape]):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(4, 11))]
+            page.insert_text((50, 70 + line * 16), " ".join(words).capitalize() + ".", fontsize=10)
+        if shape == "scanned":
+            # Trang scan: chỉ còn ảnh, không có lớp chữ
+            pix = page.get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY)
+            doc.delete_page(page_num)
+            scanned = doc.new_page(pno=page_num, width=595, height=842)
+            scanned.insert_image(scanned.rect, pixmap=pix)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None, None
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # macOS báo theo byte, Linux theo KB
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+def run_one(mode, pdf_path, target_lang, dpi, latency, workdir):
+    """Chạy một chế độ trong tiến trình hiện tại và in kết quả JSON (dùng qua --run-one)."""
+    os.chdir(workdir)  # bộ nhớ dịch (đường dẫn tương đối) nằm trong thư mục tạm, luôn bắt đầu trống
+    import dong_co_dich as engine
+    engine.ENGINE_NAME, engine.ENGINE_OPTIONS = "stub", {"latency": latency}
+    engine.REQUESTS_PER_SECOND, engine.CHARS_PER_MINUTE, engine.DEAD_LETTER_RETRY_DELAY = None, None, 0
+    stats = engine.translate_document(pdf_path, mode, target_lang, dpi)
+    self_rss, children_rss = peak_rss_mb()
+    stats["peak_rss_mb"], stats["peak_rss_children_mb"] = self_rss, children_rss
+    stats["output_bytes"] = os.path.getsize(stats["output_path"]) if stats["output_path"] else 0
+    print(json.dumps(stats))
+
+
+def git_revision():
+    try:
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=repo, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo hiệu năng các chế độ dịch trên PDF tổng hợp.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--shapes", nargs="+", choices=sorted(SHAPES), default=sorted(SHAPES))
+    parser.add_argument("--modes", nargs="+", choices=["structured", "visual"], default=["structured", "visual"])
+    parser.add_argument("--dpi", type=int, default=200, help="DPI cho chế độ trực quan")
+    parser.add_argument("--target", default="vi")
+    parser.add_argument("--latency", type=float, default=0.05, help="Độ trễ giả (giây) mỗi yêu cầu của engine stub")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "pdf_translate_bench"), help="Nơi lưu PDF tổng hợp để dùng lại")
+    parser.add_argument("--output", help="Ghi kết quả JSON ra file (mặc định in ra màn hình)")
+    parser.add_argument("--run-one", nargs=2, metavar=("MODE", "PDF"), help=argparse.SUPPRESS)
+    parser.add_argument("--make", nargs=3, metavar=("SHAPE", "PAGES", "PDF"), help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(args.run_one[0], args.run_one[1], args.target, args.dpi, args.latency, args.workdir)
+        return 0
+    if args.make:
+        make_synthetic_pdf(args.make[2], args.make[0], int(args.make[1]), args.seed)
+        return 0
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    results = []
+    for shape in args.shapes:
+        for pages in args.pages:
+            source_pdf = os.path.join(args.cache_dir, f"{shape}_{pages}_s{args.seed}.pdf")
+            if not os.path.exists(source_pdf):
+                # Tạo PDF trong tiến trình con: trên Linux, RSS đỉnh của tiến trình cha lúc fork
+                # được tính luôn cho tiến trình con và sẽ làm sai số đo bộ nhớ
+                subprocess.run([sys.executable, os.path.abspath(__file__), "--make", shape, str(pages), source_pdf, "--seed", str(args.seed)], check=True)
+            for mode in args.modes:
+                with tempfile.TemporaryDirectory() as workdir:
+                    pdf_path = os.path.join(workdir, os.path.basename(source_pdf))
+                    shutil.copy(source_pdf, pdf_path)
+                    cmd = [sys.executable, os.path.abspath(__file__), "--run-one", mode, pdf_path, "--workdir", workdir,
+                           "--dpi", str(args.dpi), "--target", args.target, "--latency", str(args.latency)]
+                    started = time.perf_counter()
+                    proc = subprocess.run(cmd, capture_output=True, text=True)
+                    wall = time.perf_counter() - started
+                    record = {"shape": shape, "pages": pages, "mode": mode, "wall_seconds": wall}
+                    if proc.returncode == 0:
+                        stats = json.loads(proc.stdout.strip().splitlines()[-1])
+                        stats.pop("output_path", None)
+                        record.update(stats)
+                        record["pages_per_sec"] = pages / stats["elapsed"] if stats["elapsed"] else None
+                        record["segments_per_sec"] = stats["segments"] / stats["elapsed"] if stats["elapsed"] else None
+                    else:
+                        record["error"] = (proc.stderr.strip().splitlines() or ["lỗi không rõ"])[-1]
+                    results.append(record)
+                    print(f"{shape:8s} {pages:4d} trang  {mode:10s} {wall:8.2f}s" + ("  LỖI: " + record["error"] if "error" in record else ""), file=sys.stderr)
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "pymupdf": fitz.VersionBind,
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "settings": {"dpi": args.dpi, "target": args.target, "latency": args.latency, "seed": args.seed},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    if os.name == 'nt': multiprocessing.freeze_support()
+    sys.exit(main())
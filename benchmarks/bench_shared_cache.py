@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import multiprocessing
+
+# =====================================================================================
+# SO SÁNH BỘ NHỚ ĐỆM DÙNG CHUNG TRONG CHẾ ĐỘ TRỰC QUAN (OCR)
+#   manager  : cách cũ - Manager.dict(), mỗi từ OCR là một lượt IPC tới tiến trình Manager,
+#              worker tự dịch cụm từ chưa có rồi ghi ngược vào Manager
+#   init_map : cách đang dùng (dong_co_dich.init_render_worker) - tiến trình cha dịch mọi cụm từ
+#              khác nhau một lần, bảng dịch được gửi cho mỗi worker một lần lúc khởi tạo Pool,
+#              worker chỉ tra dict cục bộ
+# Dòng từ OCR được mô phỏng (phân bố Zipf) để đo riêng chi phí bộ nhớ đệm, không cần
+# Tesseract hay mạng. Bản dịch giả được tạo tại chỗ.
+# =====================================================================================
+
+def make_pages(num_pages, words_per_page, vocab_size, seed):
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    return [rng.choices(vocab, weights=weights, k=words_per_page) for _ in range(num_pages)]
+
+def fake_translate(texts):
+    return [t[::-1] for t in texts]
+
+# --- CÁCH CŨ: Manager.dict ---
+def manager_page(args):
+    words, shared_cache = args
+    to_translate = [w for w in words if w not in shared_cache]
+    if to_translate:
+        unique_texts = list(set(to_translate))
+        for original, translated in zip(unique_texts, fake_translate(unique_texts)):
+            shared_cache[original] = translated
+    return sum(len(shared_cache.get(w, w)) for w in words)
+
+def run_manager(pages, prefill, processes):
+    manager = multiprocessing.Manager()
+    shared_cache = manager.dict(prefill)
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        for _ in pool.imap_unordered(manager_page, ((words, shared_cache) for words in pages)): pass
+    elapsed = time.perf_counter() - start
+    size = len(shared_cache)
+    manager.shutdown()
+    return elapsed, size
+
+# --- CÁCH ĐANG DÙNG: bảng dịch gửi một lần lúc khởi tạo worker ---
+_translations = {}
+
+def init_map_worker(translations):
+    global _translations
+    _translations = translations
+
+def init_map_page(words):
+    return sum(len(_translations.get(w, w)) for w in words)
+
+def run_init_map(pages, prefill, processes):
+    start = time.perf_counter()
+    # Bước dịch của tiến trình cha: tra bộ nhớ dịch, dịch phần còn thiếu một lượt cho cả tài liệu
+    translations = dict(prefill)
+    missing = list({w for words in pages for w in words if w not in translations})
+    translations.update(zip(missing, fake_translate(missing)))
+    with multiprocessing.Pool(processes, initializer=init_map_worker, initargs=(translations,)) as pool:
+        for _ in pool.imap_unordered(init_map_page, pages): pass
+    return time.perf_counter() - start, len(translations)
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo bộ nhớ đệm Manager.dict so với bảng dịch gửi một lần lúc khởi tạo worker.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--prefill", type=float, default=0.5, help="Tỉ lệ từ vựng đã có sẵn trong bộ nhớ dịch")
+    parser.add_argument("--processes", type=int, default=max(1, multiprocessing.cpu_count() - 1))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.words_per_page, args.vocab, args.seed)
+    prefill_words = [f"w{i}" for i in range(int(args.vocab * args.prefill))]
+    prefill = dict(zip(prefill_words, fake_translate(prefill_words)))
+
+    manager_time, manager_size = run_manager(pages, prefill, args.processes)
+    init_map_time, init_map_size = run_init_map(pages, prefill, args.processes)
+    print(json.dumps({
+        "pages": args.pages, "words_per_page": args.words_per_page, "processes": args.processes,
+        "manager_seconds": round(manager_time, 3), "init_map_seconds": round(init_map_time, 3),
+        "speedup": round(manager_time / init_map_time, 1) if init_map_time else None,
+        "manager_entries": manager_size, "init_map_entries": init_map_size,
+    }, indent=2))
+
+if __name__ == "__main__":
+    if os.name == 'nt': multiprocessing.freeze_support()
+    sys.exit(main())
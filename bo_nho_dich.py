@@ -0,0 +1,132 @@
+import os
+import json
+import sqlite3
+import threading
+import argparse
+
+# =====================================================================================
+# BỘ NHỚ DỊCH (TRANSLATION MEMORY) DÙNG SQLITE
+# Thay thế file translation_cache.json: tra cứu theo khóa (văn bản, ngôn ngữ nguồn,
+# ngôn ngữ đích, engine), ghi thêm theo lô và bật WAL để nhiều tiến trình cùng đọc/ghi.
+# =====================================================================================
+
+TM_FILE = "translation_memory.sqlite3"
+LEGACY_CACHE_FILE = "translation_cache.json"
+
+# SQLite cũ giới hạn 999 tham số cho mỗi câu lệnh
+_LOOKUP_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    source_text TEXT NOT NULL,
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    engine      TEXT NOT NULL,
+    translated  TEXT NOT NULL,
+    PRIMARY KEY (source_text, source_lang, target_lang, engine)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class TranslationMemory:
+    """Kho bản dịch lâu dài. Mỗi tiến trình tự mở một đối tượng riêng."""
+
+    def __init__(self, db_path=TM_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def get(self, text, source_lang, target_lang, engine):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT translated FROM translations WHERE source_text=? AND source_lang=? AND target_lang=? AND engine=?",
+                (text, source_lang, target_lang, engine)).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, texts, source_lang, target_lang, engine):
+        """Trả về dict {văn bản gốc: bản dịch} cho những văn bản đã có trong kho."""
+        texts = list(dict.fromkeys(texts))
+        found = {}
+        with self._lock:
+            for i in range(0, len(texts), _LOOKUP_CHUNK):
+                chunk = texts[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT source_text, translated FROM translations "
+                    f"WHERE source_lang=? AND target_lang=? AND engine=? AND source_text IN ({placeholders})",
+                    (source_lang, target_lang, engine, *chunk))
+                found.update(rows)
+        return found
+
+    def put_many(self, pairs, source_lang, target_lang, engine):
+        """Ghi thêm một lô bản dịch trong một giao dịch. Bản dịch đã có thì giữ nguyên."""
+        items = pairs.items() if isinstance(pairs, dict) else pairs
+        rows = [(original, source_lang, target_lang, engine, translated) for original, translated in items]
+        if not rows: return 0
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO translations (source_text, source_lang, target_lang, engine, translated) VALUES (?, ?, ?, ?, ?)",
+                    rows)
+        return len(rows)
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def import_json_cache(memory, json_path=LEGACY_CACHE_FILE, target_lang="vi", source_lang="auto", engine="google"):
+    """
+    Nhập một lần file translation_cache.json cũ vào bộ nhớ dịch.
+    File cũ không lưu ngôn ngữ nên phải chỉ rõ ngôn ngữ đích mà nó đã được tạo ra.
+    Trả về số mục đã nhập (0 nếu file không tồn tại hoặc đã nhập trước đó).
+    """
+    if not os.path.exists(json_path):
+        return 0
+    marker = f"imported:{os.path.abspath(json_path)}"
+    if memory.get_meta(marker):
+        return 0
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            legacy_cache = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return 0
+    pairs = [(k, v) for k, v in legacy_cache.items() if isinstance(k, str) and isinstance(v, str)]
+    memory.put_many(pairs, source_lang, target_lang, engine)
+    memory.set_meta(marker, target_lang)
+    return len(pairs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nhập translation_cache.json cũ vào bộ nhớ dịch SQLite.")
+    parser.add_argument("--json", default=LEGACY_CACHE_FILE, help="Đường dẫn file cache JSON cũ")
+    parser.add_argument("--db", default=TM_FILE, help="Đường dẫn file SQLite của bộ nhớ dịch")
+    parser.add_argument("--target", default="vi", help="Ngôn ngữ đích mà file cache cũ đã dùng (vd: vi, ja)")
+    parser.add_argument("--engine", default="google", help="Engine đã tạo ra file cache cũ")
+    args = parser.parse_args()
+    tm = TranslationMemory(args.db)
+    imported = import_json_cache(tm, args.json, target_lang=args.target, engine=args.engine)
+    print(f"Đã nhập {imported} mục. Bộ nhớ dịch hiện có {tm.count()} mục.")
+    tm.close()
@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import deque
+
+# =====================================================================================
+# BỘ NHỚ ĐỆM KẾT QUẢ OCR, ĐÁNH ĐỊA CHỈ THEO NỘI DUNG TRANG
+# Kết quả OCR không phụ thuộc ngôn ngữ đích, nên dịch lại cùng tài liệu sang ngôn ngữ khác
+# (hoặc chạy lại sau sự cố, hoặc đổi engine dịch) không cần OCR lại trang nào chưa đổi.
+# Khóa = hash của nội dung trang (luồng nội dung, ảnh, font, khung trang) cùng DPI ảnh OCR,
+# ngôn ngữ OCR, engine và phiên bản engine, cách dựng ảnh (xám/nhị phân).
+# Giá trị = bảng từ gọn của Tesseract (khung + độ tin cậy + chữ), nên đổi cấp gom đoạn hay
+# ngưỡng tin cậy vẫn dùng lại được. Tổng dung lượng có giới hạn, xóa mục lâu không dùng nhất.
+# =====================================================================================
+
+OCR_CACHE_FILE = "ocr_cache.sqlite3"
+OCR_CACHE_MAX_BYTES = 512 * 1024 * 1024
+EVICT_TO_RATIO = 0.9  # khi vượt giới hạn, xóa tới khi còn 90% để không phải dọn sau mỗi lần ghi
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_results (
+    cache_key TEXT PRIMARY KEY,
+    data      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ocr_results_last_used ON ocr_results (last_used);
+"""
+
+
+# Tham chiếu "12 0 R" trong mã nguồn đối tượng PDF. Khóa /Parent và /P trỏ ngược lên cây trang
+# (hoặc lên trang chứa chú thích), đi theo chúng thì dấu vân tay sẽ gồm cả tài liệu.
+_REFERENCE = re.compile(rb"(\d+) (\d+) R")
+_BACK_REFERENCE = re.compile(rb"/(?:Parent|P)\s+\d+\s+\d+\s+R")
+FINGERPRINT_VERSION = 2  # đổi khi cách tính dấu vân tay thay đổi, để khóa cũ trong bộ nhớ đệm không còn khớp
+
+
+def _is_page_object(doc, xref):
+    return doc.xref_get_key(xref, "Type")[1] in ("/Page", "/Pages")
+
+
+def _hash_resolved(doc, source, digest, ids):
+    """
+    Hash mã nguồn một đối tượng cùng mọi đối tượng nó tham chiếu (Form XObject lồng nhau, ảnh,
+    font, chú thích, widget và luồng hiển thị của chúng). Số xref được thay bằng thứ tự gặp lần
+    đầu, nên hai trang giống nhau ở hai file khác nhau (hoặc hai bản chép) có cùng dấu vân tay.
+    """
+    queue = deque([source])
+    while queue:
+        item = queue.popleft()
+        if isinstance(item, int):
+            digest.update(b"@obj%d" % ids[item])
+            source = doc.xref_object(item, compressed=True).encode()
+        else:
+            source = item
+
+        def canonical(match):
+            child = int(match.group(1))
+            if child not in ids:
+                if _is_page_object(doc, child): return b"@page"  # vd đích của liên kết: không ảnh hưởng tới ảnh trang
+                ids[child] = len(ids)
+                queue.append(child)
+            return b"@%d" % ids[child]
+
+        digest.update(_REFERENCE.sub(canonical, _BACK_REFERENCE.sub(b"", source)))
+        if isinstance(item, int) and doc.xref_is_stream(item): digest.update(doc.xref_stream_raw(item) or b"")
+
+
+def page_fingerprint(page):
+    """
+    Hash toàn bộ nội dung đã phân giải của một trang PDF: luồng nội dung, tài nguyên (kể cả Form
+    XObject lồng nhau và tài nguyên kế thừa từ cây trang), ảnh chưa giải nén, font, chú thích và
+    giá trị ô biểu mẫu, cùng khung và góc xoay. Hai trang cùng dấu vân tay sẽ cho cùng một ảnh.
+    """
+    doc = page.parent
+    digest = hashlib.sha1()
+    digest.update(f"{tuple(page.mediabox)}|{tuple(page.cropbox)}|{page.rotation}".encode())
+    ids = {page.xref: 0}
+    _hash_resolved(doc, page.xref, digest, ids)
+    # Tài nguyên không khai báo trên trang thì được kế thừa từ nút cha gần nhất
+    node = page.xref
+    while doc.xref_get_key(node, "Resources")[0] == "null":
+        kind, parent = doc.xref_get_key(node, "Parent")
+        if kind != "xref": break
+        node = int(parent.split()[0])
+        kind, resources = doc.xref_get_key(node, "Resources")
+        if kind in ("xref", "dict"):
+            _hash_resolved(doc, f"/Resources {resources}".encode(), digest, ids)
+            break
+    return digest.hexdigest()
+
+
+def ocr_cache_key(fingerprint, dpi, lang, engine, **options):
+    parts = [f"v{FINGERPRINT_VERSION}", fingerprint, str(dpi), lang, engine] + [f"{name}={options[name]}" for name in sorted(options)]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+class OcrCache:
+    """Kho kết quả OCR lâu dài. Mỗi tiến trình tự mở một đối tượng riêng."""
+
+    def __init__(self, db_path=OCR_CACHE_FILE, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def get(self, cache_key):
+        """Trả về bảng từ đã lưu (dict cột) hoặc None; đánh dấu mục vừa được dùng."""
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM ocr_results WHERE cache_key=?", (cache_key,)).fetchone()
+            if row is None: return None
+            with self.conn:
+                self.conn.execute("UPDATE ocr_results SET last_used=? WHERE cache_key=?", (time.time(), cache_key))
+        return json.loads(row[0])
+
+    def put(self, cache_key, data):
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO ocr_results (cache_key, data, size, last_used) VALUES (?, ?, ?, ?)",
+                                  (cache_key, text, len(text), time.time()))
+            if self.max_bytes: self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_results").fetchone()[0]
+        if total <= self.max_bytes: return
+        target, removed = total - int(self.max_bytes * EVICT_TO_RATIO), []
+        for cache_key, size in self.conn.execute("SELECT cache_key, size FROM ocr_results ORDER BY last_used"):
+            if target <= 0: break
+            removed.append((cache_key,))
+            target -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM ocr_results WHERE cache_key=?", removed)
+
+    def stats(self):
+        with self._lock:
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_results").fetchone()
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM ocr_results")
+            self.conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Xem hoặc xóa bộ nhớ đệm kết quả OCR.")
+    parser.add_argument("--db", default=OCR_CACHE_FILE, help="Đường dẫn file SQLite của bộ nhớ đệm OCR")
+    parser.add_argument("--clear", action="store_true", help="Xóa toàn bộ kết quả đã lưu")
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        print("Chưa có bộ nhớ đệm OCR.")
+    else:
+        cache = OcrCache(args.db)
+        if args.clear: cache.clear()
+        stats = cache.stats()
+        print(f"{stats['entries']} trang, {stats['bytes'] / 1024 / 1024:.1f} MB.")
+        cache.close()
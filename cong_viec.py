@@ -0,0 +1,132 @@
+import os
+import json
+import shutil
+import hashlib
+
+# =====================================================================================
+# THƯ MỤC CÔNG VIỆC: LƯU GIỮA CHỪNG VÀ CHẠY TIẾP SAU SỰ CỐ
+# Mỗi lần dịch một file có một thư mục công việc cạnh file gốc, gồm:
+#   job.json       : tham số công việc (chế độ, ngôn ngữ đích, engine, DPI...) và dấu vân tay file gốc
+#   journal.jsonl  : nhật ký hoàn thành, mỗi dòng một (giai đoạn, trang) đã xong, ghi kèm fsync
+#   <giai đoạn>/   : file kết quả từng trang/phần (PDF một trang, PDF nhiều trang...)
+# Worker của Pool tự ghi file kết quả (write_file_atomic) và chỉ gửi về đường dẫn; tiến trình
+# cha ghi nhật ký bằng record_artifact, nên dữ liệu trang không đi qua đường ống của Pool.
+# Chạy lại cùng file với cùng tham số sẽ bỏ qua mọi trang đã có trong nhật ký.
+# Tham số khác (hoặc file gốc đã đổi) thì công việc cũ bị xóa và bắt đầu lại từ đầu.
+# =====================================================================================
+
+JOB_FILE = "job.json"
+JOURNAL_FILE = "journal.jsonl"
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """Dấu vân tay nội dung file (kích thước + SHA-1), không phụ thuộc thời điểm sửa file."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""): digest.update(chunk)
+    return f"{os.path.getsize(path)}-{digest.hexdigest()}"
+
+
+def write_file_atomic(path, data):
+    """Ghi file tạm, fsync rồi đổi tên: file đích hoặc còn nguyên bản cũ, hoặc đã đầy đủ."""
+    with open(path + ".tmp", 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+
+def job_dir_for(input_path, mode, target_lang):
+    base, _ = os.path.splitext(input_path)
+    return f"{base}_{mode}_{target_lang}.job"
+
+
+class JobDirectory:
+    def __init__(self, job_dir, params):
+        self.job_dir = job_dir
+        self.params = dict(params)
+        self.resumed = False
+        self._done = {}  # giai đoạn -> {trang: bản ghi nhật ký}
+        self._journal = None
+
+    @classmethod
+    def open(cls, input_path, mode, target_lang, **params):
+        """Mở (hoặc tạo mới) thư mục công việc cho file gốc với các tham số đã cho."""
+        params.update(mode=mode, target_lang=target_lang, input=os.path.abspath(input_path),
+                      fingerprint=file_fingerprint(input_path))
+        job = cls(job_dir_for(input_path, mode, target_lang), params)
+        job._load()
+        return job
+
+    def _load(self):
+        job_file = os.path.join(self.job_dir, JOB_FILE)
+        saved = None
+        if os.path.exists(job_file):
+            try:
+                with open(job_file, 'r', encoding='utf-8') as f: saved = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                saved = None
+        if saved == self.params:
+            self._read_journal()
+            self.resumed = any(self._done.values())
+        else:
+            shutil.rmtree(self.job_dir, ignore_errors=True)
+            os.makedirs(self.job_dir, exist_ok=True)
+            with open(job_file + ".tmp", 'w', encoding='utf-8') as f: json.dump(self.params, f, ensure_ascii=False, indent=2)
+            os.replace(job_file + ".tmp", job_file)
+        self._journal = open(os.path.join(self.job_dir, JOURNAL_FILE), 'a', encoding='utf-8')
+
+    def _read_journal(self):
+        path = os.path.join(self.job_dir, JOURNAL_FILE)
+        if not os.path.exists(path): return
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # dòng cuối bị cắt ngang khi mất điện
+                artifact = entry.get("artifact")
+                if artifact and not os.path.exists(os.path.join(self.job_dir, artifact)): continue
+                self._done.setdefault(entry["stage"], {})[entry["page"]] = entry
+
+    def done(self, stage):
+        """Các trang đã xong của một giai đoạn: {trang: bản ghi nhật ký}."""
+        return self._done.get(stage, {})
+
+    def record(self, stage, page, **data):
+        """Ghi một (giai đoạn, trang) đã xong vào nhật ký; chỉ trả về khi đã nằm trên đĩa."""
+        entry = {"stage": stage, "page": page}
+        entry.update(data)
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._done.setdefault(stage, {})[page] = entry
+        return entry
+
+    def artifact_path(self, stage, page, extension="pdf"):
+        folder = os.path.join(self.job_dir, stage)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, f"{page:05d}.{extension}")
+
+    def write_artifact(self, stage, page, data, extension="pdf", **extra):
+        """Lưu kết quả của một trang (ghi file tạm rồi đổi tên) rồi mới ghi vào nhật ký."""
+        path = self.artifact_path(stage, page, extension)
+        write_file_atomic(path, data)
+        return self.record_artifact(stage, page, path, **extra)
+
+    def record_artifact(self, stage, page, path, **extra):
+        """Ghi vào nhật ký một file kết quả mà worker đã tự ghi xong (bằng write_file_atomic) vào artifact_path."""
+        return self.record(stage, page, artifact=os.path.relpath(path, self.job_dir), **extra)
+
+    def artifact(self, stage, page):
+        """Đường dẫn đầy đủ tới file kết quả đã ghi của một trang, None nếu chưa có."""
+        entry = self.done(stage).get(page)
+        return os.path.join(self.job_dir, entry["artifact"]) if entry and entry.get("artifact") else None
+
+    def close(self):
+        if self._journal and not self._journal.closed: self._journal.close()
+
+    def finish(self, keep=False):
+        """Kết thúc công việc thành công: đóng nhật ký và xóa thư mục (trừ khi keep=True)."""
+        self.close()
+        if not keep: shutil.rmtree(self.job_dir, ignore_errors=True)
@@ -0,0 +1,154 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import datetime
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import dong_co_dich as engine
+from may_dich import available_backends
+from nhan_dang import available_ocr_engines
+from dieu_phoi_dich import RateLimiter
+
+# =====================================================================================
+# DÒNG LỆNH DỊCH HÀNG LOẠT, KHÔNG CẦN GIAO DIỆN (CHẠY ĐƯỢC TRÊN MÁY CHỦ KHÔNG CÓ MÀN HÌNH)
+# Nhận file, thư mục hoặc mẫu glob; mỗi (file, ngôn ngữ đích) là một việc, chạy song song
+# trên --jobs tiến trình. Cuối cùng in (hoặc ghi ra --summary) bản tổng kết JSON.
+#
+#   python dich_thuat_cli.py sach/*.pdf --mode visual --dpi 300 --target vi ja --jobs 2 --output-dir out
+#
+# Mã thoát: 0 = mọi việc thành công, 1 = có việc lỗi, 2 = không tìm thấy file nào.
+# =====================================================================================
+
+def collect_inputs(patterns, recursive=False):
+    """Mở rộng danh sách file/thư mục/glob thành danh sách file PDF không trùng lặp, giữ thứ tự."""
+    files, seen = [], set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.pdf") if recursive else os.path.join(pattern, "*.pdf"), recursive=recursive)
+            # Bỏ qua file kết quả của những lần dịch trước nằm cùng thư mục
+            matches = [m for m in matches if "_translated_" not in os.path.basename(m)]
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+        for path in sorted(matches):
+            path = os.path.abspath(path)
+            if path not in seen and os.path.isfile(path):
+                seen.add(path)
+                files.append(path)
+    return files
+
+
+def output_path_for(input_path, mode, target_lang, output_dir=None):
+    base = os.path.splitext(os.path.basename(input_path))[0]
+    folder = output_dir or os.path.dirname(input_path)
+    return os.path.join(folder, f"{base}_translated_{mode}_{target_lang}.pdf")
+
+
+def init_worker(settings, rate_limiter):
+    """Áp dụng cấu hình dòng lệnh trong mỗi tiến trình và dùng chung một bucket giới hạn tốc độ."""
+    for name, value in settings.items():
+        if value is not None: setattr(engine, name, value)
+    if settings.get("TESSERACT_CMD"): engine.set_tesseract_cmd(settings["TESSERACT_CMD"])
+    engine.set_rate_limiter(rate_limiter)
+
+
+def run_task(task):
+    """Dịch một (file, ngôn ngữ đích). Lỗi được gói vào kết quả để các việc khác vẫn chạy tiếp."""
+    started = time.time()
+    prefix = f"[{os.path.basename(task['input'])} -> {task['target']}]"
+    status = (lambda message: print(f"{prefix} {message}", file=sys.stderr, flush=True)) if task["verbose"] else (lambda message: None)
+    result = {"input": task["input"], "target": task["target"], "mode": task["mode"]}
+    try:
+        stats = engine.translate_document(task["input"], task["mode"], task["target"], task["dpi"], status,
+                                          output_path=task["output"], num_processes=task["processes"])
+        result.update(stats)
+        result["status"] = "ok" if stats.get("output_path") else "empty"
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    result["elapsed"] = time.time() - started
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dịch hàng loạt file PDF không cần giao diện.")
+    parser.add_argument("inputs", nargs="+", help="File PDF, thư mục hoặc mẫu glob (vd: 'sach/**/*.pdf')")
+    parser.add_argument("--mode", choices=engine.MODES, default="structured")
+    parser.add_argument("--target", nargs="+", default=["vi"], help="Một hoặc nhiều ngôn ngữ đích (vd: vi ja)")
+    parser.add_argument("--dpi", type=int, default=200, help="DPI cho chế độ trực quan")
+    parser.add_argument("--output", help="Đường dẫn file kết quả (chỉ khi có đúng một file và một ngôn ngữ)")
+    parser.add_argument("--output-dir", help="Thư mục chứa file kết quả (mặc định: cạnh file gốc)")
+    parser.add_argument("--recursive", action="store_true", help="Tìm PDF trong cả thư mục con")
+    parser.add_argument("--jobs", type=int, default=1, help="Số file dịch cùng lúc")
+    parser.add_argument("--processes", type=int, help="Số tiến trình OCR/vẽ/tái tạo cho mỗi file (mặc định: chia đều số nhân CPU)")
+    parser.add_argument("--engine", choices=available_backends(), help="Engine dịch (mặc định theo dong_co_dich.ENGINE_NAME)")
+    parser.add_argument("--engine-option", action="append", default=[], metavar="KEY=VALUE", help="Tùy chọn của engine, vd: url=http://mt:5000/translate")
+    parser.add_argument("--visual-output", choices=engine.VISUAL_OUTPUTS, help="Trang OCR: vẽ lại thành ảnh (raster) hay giữ trang gốc và phủ chữ vector (overlay)")
+    parser.add_argument("--skip-rules", help="File JSON quy tắc giữ nguyên cụm từ không dịch: {\"patterns\": [...], \"terms\": [...]}")
+    parser.add_argument("--font", help="Font TrueType dùng để vẽ bản dịch (chế độ trực quan)")
+    parser.add_argument("--tesseract", help="Đường dẫn tới tesseract")
+    parser.add_argument("--ocr-engine", choices=available_ocr_engines(), help="Engine OCR (mặc định: tesserocr nếu đã cài, nếu không thì pytesseract)")
+    parser.add_argument("--summary", help="Ghi bản tổng kết JSON ra file (mặc định in ra màn hình)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="In tiến trình chi tiết của từng file ra stderr")
+    args = parser.parse_args()
+
+    files = collect_inputs(args.inputs, args.recursive)
+    if not files:
+        print("Không tìm thấy file PDF nào.", file=sys.stderr)
+        return 2
+    if args.output and (len(files) > 1 or len(args.target) > 1):
+        parser.error("--output chỉ dùng được với đúng một file và một ngôn ngữ đích; hãy dùng --output-dir.")
+    if args.output_dir: os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = max(1, args.jobs)
+    processes = args.processes or max(1, (multiprocessing.cpu_count() - 1) // jobs)
+    tasks = [{"input": path, "target": target, "mode": args.mode, "dpi": args.dpi, "processes": processes, "verbose": args.verbose,
+              "output": args.output or output_path_for(path, args.mode, target, args.output_dir)}
+             for path in files for target in args.target]
+    settings = {"ENGINE_NAME": args.engine, "FONT_PATH": args.font, "VISUAL_OUTPUT": args.visual_output,
+                "TESSERACT_CMD": args.tesseract, "OCR_ENGINE": args.ocr_engine, "PASSTHROUGH_RULES_FILE": args.skip_rules,
+                "ENGINE_OPTIONS": dict(option.split("=", 1) for option in args.engine_option) or None}
+    # Mọi tiến trình dùng chung một bucket, nên --jobs không nhân giới hạn tốc độ của engine lên
+    rate_limiter = RateLimiter.shared(engine.REQUESTS_PER_SECOND, engine.CHARS_PER_MINUTE)
+
+    started, results = time.time(), []
+    print(f"Dịch {len(tasks)} việc ({len(files)} file x {len(args.target)} ngôn ngữ), {jobs} việc song song...", file=sys.stderr)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(settings, rate_limiter)) as executor:
+        futures = [executor.submit(run_task, task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            mark = {"ok": "OK ", "empty": "RỖNG"}.get(result["status"], "LỖI")
+            print(f"[{len(results)}/{len(tasks)}] {mark} {result['input']} -> {result['target']} ({result['elapsed']:.1f}s)"
+                  + (f"  {result['error']}" if result["status"] == "error" else ""), file=sys.stderr)
+
+    order = {(task["input"], task["target"]): i for i, task in enumerate(tasks)}
+    results.sort(key=lambda r: order[(r["input"], r["target"])])
+    failed = sum(1 for r in results if r["status"] == "error")
+    summary = {
+        "started": datetime.datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+        "elapsed": time.time() - started,
+        "mode": args.mode,
+        "targets": args.target,
+        "total": len(results),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "empty": sum(1 for r in results if r["status"] == "empty"),
+        "failed": failed,
+        "results": results,
+    }
+    text = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f: f.write(text)
+    else:
+        print(text)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    if os.name == 'nt': multiprocessing.freeze_support()
+    sys.exit(main())
@@ -6,15 +6,19 @@ import time
 
 # Các thư viện xử lý file, ảnh và dịch thuật
 import fitz  # PyMuPDF
-from PIL import Image, ImageDraw, ImageTk, ImageFont
+from PIL import Image, ImageDraw, ImageTk
 import pytesseract
-from deep_translator import GoogleTranslator
+from may_dich import create_backend
+from ghi_pdf import StreamingPdfWriter
+from ve_chu import draw_text_with_wrapping
+from nhan_dang import ocr_boxes
 
 # --- CẤU HÌNH QUAN TRỌNG ---
 try:
     pytesseract.pytesseract.tesseract_cmd = r'D:\Program Files\Tesseract-OCR\tesseract.exe'
 except Exception:
     print("LƯU Ý: Không tìm thấy Tesseract ở đường dẫn mặc định. Vui lòng chỉnh sửa đường dẫn trong code.")
+ENGINE_NAME = "google"  # engine dịch: "google", "http" (máy chủ nội bộ) hoặc "stub" (offline)
 
 # --- CÁC HÀM LÕI XỬ LÝ DỊCH THUẬT (BACKEND) ---
 
@@ -23,9 +27,13 @@ def run_visual_translation_process(input_path, target_lang, status_callback, ima
     Hàm chính chạy trong một luồng riêng để không làm treo giao diện.
     Thực hiện dịch thuật dựa trên hình ảnh.
     """
+    writer = None
     try:
         doc = fitz.open(input_path)
-        translated_pages_images = []
+        base, _ = os.path.splitext(input_path)
+        output_path = f"{base}_dich_visual.pdf"
+        # Ghi từng trang vào PDF ngay khi dịch xong để không giữ toàn bộ ảnh trong RAM
+        writer = StreamingPdfWriter(output_path, 200)
 
         for page_num in range(len(doc)):
             status_callback(f"--- Đang xử lý trang {page_num + 1}/{len(doc)} ---")
@@ -37,40 +45,33 @@ def run_visual_translation_process(input_path, target_lang, status_callback, ima
             draw = ImageDraw.Draw(img)
 
             status_callback("Bước 2: Nhận dạng văn bản và vị trí (OCR)...")
-            ocr_data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, lang='eng+vie')
-            
-            num_boxes = len(ocr_data['level'])
+            # Các từ được gom thành đoạn văn, mỗi đoạn là một cụm dịch có đủ ngữ cảnh câu
+            segments = ocr_boxes(img)
             boxes_to_process = []
             
             # ==================================================================
             # THAY ĐỔI LỚN: Dịch từng đoạn một thay vì gộp chung
             # ==================================================================
-            status_callback("Bước 3: Bắt đầu dịch từng cụm từ (sẽ chậm hơn)...")
-            translator = GoogleTranslator(source='auto', target=target_lang)
+            status_callback(f"Bước 3: Bắt đầu dịch {len(segments)} đoạn văn...")
+            translator = create_backend(ENGINE_NAME, source='auto', target=target_lang)
             
-            for i in range(num_boxes):
-                if int(ocr_data['conf'][i]) > 60:
-                    text = ocr_data['text'][i].strip()
-                    h = ocr_data['height'][i]
-
-                    if text and h > 1:
-                        (x, y, w) = (ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i])
-                        
-                        # Dịch ngay lập tức
-                        try:
-                            translated_text = translator.translate(text)
-                            if not translated_text: # Nếu dịch ra rỗng, giữ lại text gốc
-                                translated_text = text
-                        except Exception as e:
-                            status_callback(f"Lỗi dịch nhỏ: {e}. Giữ lại text gốc.")
-                            translated_text = text # Giữ lại text gốc nếu có lỗi
-                        
-                        # Thêm vào danh sách để vẽ lại sau
-                        boxes_to_process.append({'box': (x, y, w, h), 'text': translated_text})
-                        
-                        # Cập nhật log thường xuyên hơn
-                        if len(boxes_to_process) % 10 == 0:
-                            status_callback(f"Đã dịch {len(boxes_to_process)} cụm từ...")
+            for (x, y, w, h, text) in segments:
+                if h > 1:
+                    # Dịch ngay lập tức
+                    try:
+                        translated_text = translator.translate_batch([text])[0]
+                        if not translated_text: # Nếu dịch ra rỗng, giữ lại text gốc
+                            translated_text = text
+                    except Exception as e:
+                        status_callback(f"Lỗi dịch nhỏ: {e}. Giữ lại text gốc.")
+                        translated_text = text # Giữ lại text gốc nếu có lỗi
+                    
+                    # Thêm vào danh sách để vẽ lại sau
+                    boxes_to_process.append({'box': (x, y, w, h), 'text': translated_text})
+                    
+                    # Cập nhật log thường xuyên hơn
+                    if len(boxes_to_process) % 10 == 0:
+                        status_callback(f"Đã dịch {len(boxes_to_process)} đoạn...")
 
             # ==================================================================
             
@@ -81,29 +82,16 @@ def run_visual_translation_process(input_path, target_lang, status_callback, ima
                 
                 draw.rectangle([x, y, x + w, y + h], fill='white', outline='white')
                 
-                try:
-                    font_size = int(h * 0.8)
-                    font = ImageFont.truetype("arial.ttf", size=max(1, font_size))
-                except IOError:
-                    font = ImageFont.load_default()
-                
-                draw.text((x, y), translated_text, font=font, fill='black')
+                # Đoạn văn có nhiều dòng nên cần ngắt dòng cho vừa khung bao gộp
+                draw_text_with_wrapping(draw, translated_text, (x, y, w, h), "arial.ttf")
 
             status_callback("Bước 5: Cập nhật giao diện...")
             image_update_callback(img)
-            translated_pages_images.append(img)
+            writer.add(page_num, img)
             time.sleep(0.1) # Giảm thời gian nghỉ
 
-        if translated_pages_images:
-            status_callback("Bước 6: Lưu tất cả các trang đã dịch vào file PDF mới...")
-            base, _ = os.path.splitext(input_path)
-            output_path = f"{base}_dich_visual.pdf"
-            
-            translated_pages_images[0].save(
-                output_path,
-                save_all=True,
-                append_images=translated_pages_images[1:]
-            )
+        status_callback("Bước 6: Hoàn tất và lưu file PDF mới...")
+        if writer.close():
             status_callback(f"--- HOÀN THÀNH! ---")
             status_callback(f"Đã lưu thành công vào file: {output_path}")
             messagebox.showinfo("Thành công", f"Đã dịch và lưu file thành công!\n\nFile được lưu tại: {output_path}")
@@ -111,6 +99,7 @@ def run_visual_translation_process(input_path, target_lang, status_callback, ima
             status_callback("Không có trang nào được dịch.")
 
     except Exception as e:
+        if writer: writer.abort()
         status_callback(f"Lỗi nghiêm trọng trong quá trình dịch: {e}")
         messagebox.showerror("Lỗi", f"Một lỗi nghiêm trọng đã xảy ra:\n{e}")
     finally:
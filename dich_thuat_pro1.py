@@ -4,13 +4,16 @@ import threading
 import os
 import time
 import datetime
-import io
 
 # Các thư viện xử lý file, ảnh và dịch thuật
 import fitz  # PyMuPDF
-from PIL import Image, ImageDraw, ImageTk, ImageFont
+from PIL import Image, ImageDraw, ImageTk
 import pytesseract
-from deep_translator import GoogleTranslator
+from may_dich import create_backend
+from ghi_pdf import StreamingPdfWriter
+from theo_doi import trace_span, Tracer, EtaEstimator
+from ve_chu import draw_text_with_wrapping
+from nhan_dang import ocr_boxes
 
 # --- CẤU HÌNH QUAN TRỌNG ---
 try:
@@ -19,101 +22,64 @@ try:
 except Exception:
     print("LƯU Ý: Không tìm thấy Tesseract hoặc font Arial. Vui lòng chỉnh sửa đường dẫn trong code.")
     FONT_PATH = None
+ENGINE_NAME = "google"  # engine dịch: "google", "http" (máy chủ nội bộ) hoặc "stub" (offline)
 
 # --- CÁC HÀM LÕI XỬ LÝ DỊCH THUẬT (BACKEND) ---
 
-def draw_text_with_wrapping(draw, text, box, font_path):
-    x, y, w, h = box
-    font = ImageFont.load_default()
-    font_size = int(h * 0.95) 
-    
-    while font_size > 5:
-        try:
-            font = ImageFont.truetype(font_path, size=font_size)
-        except IOError:
-            font = ImageFont.load_default()
-
-        words = text.split()
-        lines = []
-        current_line = ""
-
-        for word in words:
-            if font.getbbox(current_line + " " + word)[2] <= w:
-                current_line += " " + word
-            else:
-                lines.append(current_line.strip())
-                current_line = word
-        lines.append(current_line.strip())
-
-        total_height = sum(font.getbbox(line)[3] - font.getbbox(line)[1] for line in lines)
-
-        if total_height <= h:
-            current_y = y
-            for line in lines:
-                line_height = font.getbbox(line)[3] - font.getbbox(line)[1]
-                draw.text((x, current_y), line, font=font, fill='black')
-                current_y += line_height
-            return
-        else:
-            font_size -= 1
-    
-    if text:
-        draw.text((x, y), text[:20]+"...", font=font, fill='black')
-
 def run_visual_translation_process(input_path, target_lang, quality_dpi, status_callback, image_update_callback, progress_callback, stats_update_callback, enable_ui_callback):
+    writer = None
     try:
         doc = fitz.open(input_path)
         total_pages = len(doc)
-        translated_pages_images = []
+        base, _ = os.path.splitext(input_path)
+        # Bạn có thể đổi tên file ở đây nếu muốn
+        output_path = f"{base}_translated.pdf"
+        # Mỗi trang được ghi ngay vào PDF đích, RAM không tăng theo số trang
+        writer = StreamingPdfWriter(output_path, quality_dpi)
         translation_cache = {}
         start_time = time.time()
+        # ETR tính theo tốc độ riêng của từng bước thay vì trung bình cả trang
+        tracer = Tracer()
+        eta = EtaEstimator(tracer, total_pages, ["rasterize", "ocr", "translate", "render", "encode"])
 
         for page_num in range(total_pages):
             status_callback(f"--- Đang xử lý trang {page_num + 1}/{total_pages} ---")
             
             elapsed_time = time.time() - start_time
-            if page_num > 0:
-                avg_time_per_page = elapsed_time / page_num
-                remaining_pages = total_pages - page_num
-                etr = avg_time_per_page * remaining_pages
-                etr_str = str(datetime.timedelta(seconds=int(etr)))
-            else:
-                etr_str = "Đang tính toán..."
-            
             stats_update_callback({
                 "page": f"{page_num + 1} / {total_pages}",
                 "elapsed": str(datetime.timedelta(seconds=int(elapsed_time))),
-                "etr": etr_str
+                "etr": eta.format()
             })
 
             status_callback("Bước 1: Chuyển đổi trang thành hình ảnh...")
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap(dpi=quality_dpi)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            draw = ImageDraw.Draw(img)
+            with trace_span("rasterize", page=page_num):
+                page = doc.load_page(page_num)
+                pix = page.get_pixmap(dpi=quality_dpi)
+                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                draw = ImageDraw.Draw(img)
 
             status_callback("Bước 2: Nhận dạng văn bản và vị trí (OCR)...")
-            ocr_data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, lang='eng+vie')
+            with trace_span("ocr", page=page_num) as span:
+                # Các từ được gom thành đoạn văn, mỗi đoạn là một cụm dịch có đủ ngữ cảnh câu
+                segments = ocr_boxes(img)
+                span["boxes"] = len(segments)
             
-            num_boxes = len(ocr_data['level'])
             boxes_to_process = []
             
-            status_callback("Bước 3: Bắt đầu dịch từng cụm từ...")
-            translator = GoogleTranslator(source='auto', target=target_lang)
-            
-            for i in range(num_boxes):
-                if int(ocr_data['conf'][i]) > 60:
-                    text = ocr_data['text'][i].strip()
-                    h = ocr_data['height'][i]
-
-                    if text and h > 1:
-                        (x, y, w) = (ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i])
-                        
+            status_callback(f"Bước 3: Bắt đầu dịch {len(segments)} đoạn văn...")
+            with trace_span("translate", page=page_num, cache_hits=0, cache_misses=0) as span:
+                translator = create_backend(ENGINE_NAME, source='auto', target=target_lang)
+                
+                for (x, y, w, h, text) in segments:
+                    if h > 1:
                         if text in translation_cache:
                             translated_text = translation_cache[text]
+                            span["cache_hits"] += 1
                         else:
+                            span["cache_misses"] += 1
                             try:
-                                translated_text = translator.translate(text)
+                                translated_text = translator.translate_batch([text])[0]
                                 if not translated_text: translated_text = text
                                 translation_cache[text] = translated_text
                             except Exception:
@@ -122,45 +88,24 @@ def run_visual_translation_process(input_path, target_lang, quality_dpi, status_
                         boxes_to_process.append({'box': (x, y, w, h), 'text': translated_text})
 
             status_callback("Bước 4: Tái tạo lại trang đã dịch...")
-            for item in boxes_to_process:
-                (x, y, w, h) = item['box']
-                draw.rectangle([x, y, x + w, y + h], fill='white', outline='white')
-                draw_text_with_wrapping(draw, item['text'], item['box'], FONT_PATH)
+            with trace_span("render", page=page_num, boxes=len(boxes_to_process)):
+                for item in boxes_to_process:
+                    (x, y, w, h) = item['box']
+                    draw.rectangle([x, y, x + w, y + h], fill='white', outline='white')
+                    draw_text_with_wrapping(draw, item['text'], item['box'], FONT_PATH)
 
             status_callback("Bước 5: Cập nhật giao diện...")
             image_update_callback(img)
-            translated_pages_images.append(img)
+            with trace_span("encode", page=page_num):
+                writer.add(page_num, img)
             progress_callback(page_num + 1)
             time.sleep(0.1)
 
         # ==================================================================
-        # THAY ĐỔI LỚN: SỬ DỤNG PYMUPDF ĐỂ LƯU FILE, ĐẢM BẢO ỔN ĐỊNH
+        # CÁC TRANG ĐÃ ĐƯỢC GHI DẦN VÀO PDF, CHỈ CÒN BƯỚC LƯU FILE
         # ==================================================================
-        if translated_pages_images:
-            status_callback("Bước 6: Bắt đầu lưu file PDF mới (phương pháp ổn định)...")
-            base, _ = os.path.splitext(input_path)
-            # Bạn có thể đổi tên file ở đây nếu muốn
-            output_path = f"{base}_translated.pdf" 
-            
-            output_doc = fitz.open() # Tạo một file PDF trắng
-            
-            for i, img in enumerate(translated_pages_images):
-                status_callback(f"Đang ghép trang {i+1}/{len(translated_pages_images)} vào PDF...")
-                
-                # Chuyển ảnh từ Pillow sang dạng bytes mà PyMuPDF có thể đọc
-                img_bytes = io.BytesIO()
-                img.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
-
-                # Tạo trang mới và chèn ảnh vào
-                page_rect = fitz.Rect(0, 0, img.width, img.height)
-                new_page = output_doc.new_page(width=img.width, height=img.height)
-                new_page.insert_image(page_rect, stream=img_bytes)
-
-            # Lưu file PDF đã hoàn chỉnh
-            output_doc.save(output_path)
-            output_doc.close()
-            
+        status_callback("Bước 6: Hoàn tất và lưu file PDF mới...")
+        if writer.close():
             status_callback(f"--- HOÀN THÀNH! ---")
             status_callback(f"Đã lưu thành công vào file: {output_path}")
             messagebox.showinfo("Thành công", f"Đã dịch và lưu file thành công!\n\nFile được lưu tại: {output_path}")
@@ -168,6 +113,7 @@ def run_visual_translation_process(input_path, target_lang, quality_dpi, status_
             status_callback("Không có trang nào được dịch.")
 
     except Exception as e:
+        if writer: writer.abort()
         status_callback(f"Lỗi nghiêm trọng trong quá trình dịch: {e}")
         messagebox.showerror("Lỗi", f"Một lỗi nghiêm trọng đã xảy ra:\n{e}")
     finally:
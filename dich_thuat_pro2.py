@@ -4,53 +4,32 @@ import threading
 import os
 import time
 import datetime
-import json
 import multiprocessing
 
 # --- THƯ VIỆN CẦN THIẾT ---
 import fitz  # PyMuPDF
 from PIL import Image, ImageDraw, ImageTk, ImageFont
 import pytesseract
-from deep_translator import GoogleTranslator
+from dong_co_dich import create_dispatcher, translate_unique_texts, get_translation_memory
 
 # --- CẤU HÌNH QUAN TRỌNG ---
 try:
     pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
     FONT_PATH = "arial.ttf"
-    CACHE_FILE = "translation_cache.json"
+    # Engine dịch được cấu hình bằng ENGINE_NAME trong dong_co_dich.py
 except Exception as e:
     print(f"LỖI CẤU HÌNH: {e}. Vui lòng kiểm tra lại đường dẫn Tesseract và Font.")
     FONT_PATH = None
-    CACHE_FILE = "translation_cache.json"
 
 # =====================================================================================
 # PHƯƠNG PHÁP 2: DỊCH CẤU TRÚC (GIỮ NGUYÊN ĐỊNH DẠNG)
 # =====================================================================================
 
-def load_translation_cache():
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return {}
-    return {}
-
-def save_translation_cache(cache):
-    try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
-    except IOError:
-        print("Không thể lưu file cache.")
-
 def run_structured_translation_process(input_path, target_lang, status_callback, progress_callback, enable_ui_callback):
     try:
         status_callback("--- BẮT ĐẦU DỊCH CẤU TRÚC (GIỮ ĐỊNH DẠNG) ---")
         start_time = time.time()
         
-        translation_cache = load_translation_cache()
-        translator = GoogleTranslator(source='auto', target=target_lang)
-        
         doc = fitz.open(input_path)
         total_pages = len(doc)
         progress_callback(0, total_pages)
@@ -69,36 +48,14 @@ def run_structured_translation_process(input_path, target_lang, status_callback,
             all_spans_by_page.append(page_spans)
             all_texts.extend([span["text"].strip() for span in page_spans if span["text"].strip()])
 
-        unique_texts_to_translate = list(set(t for t in all_texts if t not in translation_cache))
-        
-        # Bước 2: Dịch hàng loạt THEO TỪNG GÓI (CHUNK)
-        if unique_texts_to_translate:
-            status_callback(f"Bước 2: Chuẩn bị dịch {len(unique_texts_to_translate)} cụm từ mới...")
-            
-            # ==================================================================
-            # SỬA LỖI ĐỨNG HÌNH: Chia danh sách cần dịch thành các gói nhỏ
-            # ==================================================================
-            chunk_size = 100  # Dịch 100 cụm từ mỗi lần
-            total_to_translate = len(unique_texts_to_translate)
-            translated_count = 0
-
-            for i in range(0, total_to_translate, chunk_size):
-                chunk = unique_texts_to_translate[i:i + chunk_size]
-                try:
-                    translated_snippets = translator.translate_batch(chunk)
-                    # Cập nhật cache sau khi dịch thành công 1 gói
-                    for original, translated in zip(chunk, translated_snippets):
-                        translation_cache[original] = translated if translated else original
-                    
-                    translated_count += len(chunk)
-                    status_callback(f"Đang dịch... ({translated_count}/{total_to_translate})")
-                    
-                    # Lưu cache định kỳ để phòng trường hợp lỗi giữa chừng
-                    save_translation_cache(translation_cache)
-
-                except Exception as e:
-                    status_callback(f"Lỗi khi dịch gói {i//chunk_size + 1}. Bỏ qua gói này. Lỗi: {e}")
-                    time.sleep(2) # Chờ một chút trước khi thử lại gói tiếp theo
+        # Tra bộ nhớ dịch và gửi phần còn lại qua bộ điều phối chung (giới hạn tốc độ, thử lại,
+        # dead letter); cụm từ không dịch được thì không có trong kết quả và được giữ nguyên
+        unique_texts = list(set(all_texts))
+        dispatcher = create_dispatcher(target_lang)
+        try:
+            translation_cache, _ = translate_unique_texts(unique_texts, target_lang, get_translation_memory(), dispatcher, status_callback)
+        finally:
+            dispatcher.close()
 
         status_callback("Bước 3: Bắt đầu tái tạo lại các trang...")
         for i, page in enumerate(doc):
@@ -2,95 +2,17 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
 import os
-import time
 import datetime
-import json
 import multiprocessing
 
-# --- THƯ VIỆN CẦN THIẾT ---
-import fitz  # PyMuPDF
-from PIL import Image, ImageDraw, ImageTk, ImageFont
-import pytesseract
-from deep_translator import GoogleTranslator
+# Toàn bộ phần xử lý nằm ở dong_co_dich.py, giao diện chỉ gọi vào và hiển thị kết quả
+from dong_co_dich import translate_structured, translate_visual, translate_auto
 
-# --- CẤU HÌNH QUAN TRỌNG ---
-try:
-    pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-    FONT_PATH = "arial.ttf"
-    CACHE_FILE = "translation_cache.json"
-except Exception as e:
-    print(f"LỖI CẤU HÌNH: {e}. Vui lòng kiểm tra lại đường dẫn Tesseract và Font.")
-    FONT_PATH = None
-    CACHE_FILE = "translation_cache.json"
-
-# =====================================================================================
-# CÁC HÀM TIỆN ÍCH VÀ XỬ LÝ LÕI
-# =====================================================================================
-
-def load_translation_cache():
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r', encoding='utf-8') as f: return json.load(f)
-        except (json.JSONDecodeError, IOError): return {}
-    return {}
-
-def save_translation_cache(cache):
-    try:
-        with open(CACHE_FILE, 'w', encoding='utf-8') as f: json.dump(cache, f, ensure_ascii=False, indent=2)
-    except IOError: print("Không thể lưu file cache.")
-
-# --- BỘ XỬ LÝ CHO CHẾ ĐỘ "CẤU TRÚC" ---
+# --- CHẠY DỊCH TRONG LUỒNG NỀN VÀ BÁO KẾT QUẢ LÊN GIAO DIỆN ---
 def run_structured_translation_process(input_path, target_lang, status_callback, progress_callback, enable_ui_callback):
-    # ... (Hàm này không thay đổi, đã ổn định)
     try:
-        status_callback("--- BẮT ĐẦU DỊCH CẤU TRÚC (GIỮ ĐỊNH DẠNG) ---")
-        start_time = time.time()
-        translation_cache, translator = load_translation_cache(), GoogleTranslator(source='auto', target=target_lang)
-        doc = fitz.open(input_path)
-        total_pages = len(doc)
-        progress_callback(0, total_pages)
-        status_callback("Bước 1: Thu thập toàn bộ văn bản từ tài liệu...")
-        all_texts, all_spans_by_page = [], []
-        for page in doc:
-            page_spans, blocks = [], page.get_text("dict")["blocks"]
-            for block in blocks:
-                if "lines" in block:
-                    for line in block["lines"]: page_spans.extend(line["spans"])
-            all_spans_by_page.append(page_spans)
-            all_texts.extend([span["text"].strip() for span in page_spans if span["text"].strip()])
-        unique_texts_to_translate = list(set(t for t in all_texts if t not in translation_cache))
-        if unique_texts_to_translate:
-            status_callback(f"Bước 2: Chuẩn bị dịch {len(unique_texts_to_translate)} cụm từ mới...")
-            chunk_size, total_to_translate, translated_count = 100, len(unique_texts_to_translate), 0
-            for i in range(0, total_to_translate, chunk_size):
-                chunk = unique_texts_to_translate[i:i + chunk_size]
-                try:
-                    translated_snippets = translator.translate_batch(chunk)
-                    for original, translated in zip(chunk, translated_snippets):
-                        translation_cache[original] = translated if translated else original
-                    translated_count += len(chunk)
-                    status_callback(f"Đang dịch... ({translated_count}/{total_to_translate})")
-                    save_translation_cache(translation_cache)
-                except Exception as e:
-                    status_callback(f"Lỗi khi dịch gói {i//chunk_size + 1}. Bỏ qua. Lỗi: {e}")
-                    time.sleep(2)
-        status_callback("Bước 3: Bắt đầu tái tạo lại các trang...")
-        for i, page in enumerate(doc):
-            status_callback(f"Đang tái tạo trang {i + 1}/{total_pages}...")
-            spans_on_this_page = all_spans_by_page[i]
-            for span in spans_on_this_page:
-                original_text = span["text"].strip()
-                if original_text in translation_cache:
-                    translated_text = translation_cache[original_text]
-                    page.add_redact_annot(span["bbox"], text=translated_text, fontname=span["font"], fontsize=span["size"], text_color=span["color"], align=fitz.TEXT_ALIGN_LEFT)
-            page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
-            progress_callback(i + 1, total_pages)
-        base, _ = os.path.splitext(input_path)
-        output_path = f"{base}_translated_structured.pdf"
-        doc.save(output_path, garbage=4, deflate=True, clean=True)
-        elapsed = time.time() - start_time
-        status_callback(f"--- HOÀN THÀNH sau {elapsed:.2f} giây! ---")
-        messagebox.showinfo("Thành công", f"Đã dịch và lưu file thành công!\nFile được lưu tại:\n{output_path}")
+        result = translate_structured(input_path, target_lang, status_callback, progress_callback)
+        messagebox.showinfo("Thành công", f"Đã dịch và lưu file thành công!\nFile được lưu tại:\n{result['output_path']}")
     except Exception as e:
         import traceback
         error_msg = f"Một lỗi nghiêm trọng đã xảy ra:\n{traceback.format_exc()}"
@@ -99,108 +21,11 @@ def run_structured_translation_process(input_path, target_lang, status_callback,
     finally:
         enable_ui_callback()
 
-# --- BỘ XỬ LÝ CHO CHẾ ĐỘ "TRỰC QUAN (OCR)" ---
-def draw_text_with_wrapping(draw, text, box, font_path):
-    # ... (Hàm này không thay đổi)
-    x, y, w, h = box
-    font_size, font = int(h * 0.9), None
-    while font_size > 5:
-        try: font = ImageFont.truetype(font_path, size=font_size)
-        except (IOError, TypeError): font = ImageFont.load_default()
-        words = text.split()
-        if not words: return
-        lines, current_line = [], words[0]
-        for word in words[1:]:
-            if font.getbbox(current_line + " " + word)[2] <= w: current_line += " " + word
-            else: lines.append(current_line); current_line = word
-        lines.append(current_line)
-        total_height = sum(font.getbbox(line)[3] - font.getbbox(line)[1] for line in lines)
-        if total_height <= h:
-            current_y = y
-            for line in lines:
-                line_height = font.getbbox(line)[3] - font.getbbox(line)[1]
-                draw.text((x, current_y), line, font=font, fill='black'); current_y += line_height
-            return
-        font_size -= 1
-    if text:
-        if not font:
-            try: font = ImageFont.truetype(font_path, size=8)
-            except (IOError, TypeError): font = ImageFont.load_default()
-        draw.text((x, y), text[:20] + "...", font=font, fill='black')
-
-def process_single_page_visual(args):
-    page_num, input_path, quality_dpi, target_lang, shared_cache, font_path = args
-    doc = fitz.open(input_path)
-    page = doc.load_page(page_num)
-    pix = page.get_pixmap(dpi=quality_dpi)
-    
-    # ==================================================================
-    # ĐOẠN MÃ ĐÃ SỬA LỖI UnboundLocalError
-    # Tách việc tạo img và draw ra 2 dòng riêng biệt.
-    # ==================================================================
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    draw = ImageDraw.Draw(img)
-    
-    doc.close()
-    ocr_data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, lang='eng+vie')
-    text_info_map, texts_to_translate_on_page = [], []
-    for i in range(len(ocr_data['level'])):
-        if int(ocr_data['conf'][i]) > 60:
-            text = ocr_data['text'][i].strip()
-            if text:
-                if text not in shared_cache: texts_to_translate_on_page.append(text)
-                x, y, w, h = ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i], ocr_data['height'][i]
-                text_info_map.append({'box': (x, y, w, h), 'original_text': text})
-    if texts_to_translate_on_page:
-        translator = GoogleTranslator(source='auto', target=target_lang)
-        try:
-            unique_texts = list(set(texts_to_translate_on_page))
-            translated_texts = translator.translate_batch(unique_texts)
-            for original, translated in zip(unique_texts, translated_texts):
-                shared_cache[original] = translated if translated else original
-        except Exception:
-            for text in unique_texts: shared_cache[text] = text # Fallback
-    for item in text_info_map:
-        translated_text = shared_cache.get(item['original_text'], item['original_text'])
-        draw.rectangle([item['box'][0], item['box'][1], item['box'][0] + item['box'][2], item['box'][1] + item['box'][3]], fill='white', outline='white')
-        draw_text_with_wrapping(draw, translated_text, item['box'], font_path)
-    return (page_num, img)
-
-def run_visual_translation_process(input_path, target_lang, quality_dpi, status_callback, progress_callback, enable_ui_callback):
+def run_visual_translation_process(input_path, target_lang, quality_dpi, status_callback, progress_callback, enable_ui_callback, output_kind=None):
     try:
-        doc = fitz.open(input_path)
-        total_pages = len(doc)
-        doc.close()
-
-        manager = multiprocessing.Manager()
-        shared_cache = manager.dict(load_translation_cache())
-        
-        num_processes = max(1, multiprocessing.cpu_count() - 1)
-        pool = multiprocessing.Pool(processes=num_processes)
-        tasks = [(i, input_path, quality_dpi, target_lang, shared_cache, FONT_PATH) for i in range(total_pages)]
-        
-        translated_pages_images, completed_count = [None] * total_pages, 0
-        status_callback(f"Bắt đầu dịch trực quan {total_pages} trang trên {num_processes} nhân CPU...")
-        progress_callback(0, total_pages)
-        
-        for page_num, result_image in pool.imap_unordered(process_single_page_visual, tasks):
-            completed_count += 1
-            translated_pages_images[page_num] = result_image
-            progress_callback(completed_count, total_pages)
-            status_callback(f"Đã xử lý xong trang {page_num + 1}/{total_pages}")
-            
-        pool.close()
-        pool.join()
-        
-        if any(p is not None for p in translated_pages_images):
-            status_callback("Đang lưu tất cả các trang vào file PDF mới...")
-            base, _ = os.path.splitext(input_path)
-            output_path = f"{base}_translated_visual.pdf"
-            valid_images = [img for img in translated_pages_images if img is not None]
-            valid_images[0].save(output_path, save_all=True, append_images=valid_images[1:])
-            save_translation_cache(dict(shared_cache))
-            status_callback(f"--- HOÀN THÀNH! Đã lưu vào: {output_path} ---")
-            messagebox.showinfo("Thành công", f"Đã dịch và lưu file thành công!\nFile được lưu tại:\n{output_path}")
+        result = translate_visual(input_path, target_lang, quality_dpi, status_callback, progress_callback, output_kind=output_kind)
+        if result["output_path"]:
+            messagebox.showinfo("Thành công", f"Đã dịch và lưu file thành công!\nFile được lưu tại:\n{result['output_path']}")
     except Exception as e:
         import traceback
         error_msg = f"Lỗi trong quá trình dịch trực quan:\n{traceback.format_exc()}"
@@ -209,6 +34,19 @@ def run_visual_translation_process(input_path, target_lang, quality_dpi, status_
     finally:
         enable_ui_callback()
 
+def run_auto_translation_process(input_path, target_lang, quality_dpi, status_callback, progress_callback, enable_ui_callback, output_kind=None):
+    try:
+        result = translate_auto(input_path, target_lang, quality_dpi, status_callback, progress_callback, output_kind=output_kind)
+        if result["output_path"]:
+            messagebox.showinfo("Thành công", f"Đã dịch và lưu file thành công!\nFile được lưu tại:\n{result['output_path']}")
+    except Exception as e:
+        import traceback
+        error_msg = f"Lỗi trong quá trình dịch tự động:\n{traceback.format_exc()}"
+        status_callback(error_msg)
+        messagebox.showerror("Lỗi", error_msg)
+    finally:
+        enable_ui_callback()
+
 # --- LỚP GIAO DIỆN NGƯỜI DÙNG (UI) ---
 class TranslatorApp:
     def __init__(self, root):
@@ -246,12 +84,16 @@ class TranslatorApp:
         self.mode_var.trace("w", self.on_mode_change)
         ttk.Radiobutton(mode_frame, text="Cấu trúc (Nhanh, Giữ định dạng)", variable=self.mode_var, value="structured").pack(anchor=tk.W, padx=5)
         ttk.Radiobutton(mode_frame, text="Trực quan (OCR cho file scan)", variable=self.mode_var, value="visual").pack(anchor=tk.W, padx=5)
+        ttk.Radiobutton(mode_frame, text="Tự động (chọn theo từng trang)", variable=self.mode_var, value="auto").pack(anchor=tk.W, padx=5)
 
-        self.quality_frame = ttk.LabelFrame(main_frame, text="Bước 3.5: Chọn Chất lượng (chỉ cho OCR)")
+        self.quality_frame = ttk.LabelFrame(main_frame, text="Bước 3.5: Chọn Chất lượng (cho các trang OCR)")
         self.quality_var = tk.IntVar(value=200)
         ttk.Radiobutton(self.quality_frame, text="Nhanh (150 DPI)", variable=self.quality_var, value=150).pack(side=tk.LEFT, padx=10)
         ttk.Radiobutton(self.quality_frame, text="Cân bằng (200 DPI)", variable=self.quality_var, value=200).pack(side=tk.LEFT, padx=10)
         ttk.Radiobutton(self.quality_frame, text="Chất lượng cao (300 DPI)", variable=self.quality_var, value=300).pack(side=tk.LEFT, padx=10)
+        # Giữ trang gốc và chỉ phủ chữ vector: file nhỏ hơn nhiều, không phải nén lại ảnh cả trang
+        self.overlay_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.quality_frame, text="Giữ trang gốc (phủ chữ vector)", variable=self.overlay_var).pack(side=tk.LEFT, padx=10)
 
         self.start_button = ttk.Button(main_frame, text="Bước 4: Bắt Đầu Dịch", command=self.start_translation_thread, style="Accent.TButton")
         self.start_button.pack(fill=tk.X, padx=5, pady=10, ipady=5)
@@ -271,7 +113,7 @@ class TranslatorApp:
         self.on_mode_change()
 
     def on_mode_change(self, *args):
-        if self.mode_var.get() == "visual":
+        if self.mode_var.get() in ("visual", "auto"):
             self.quality_frame.pack(fill=tk.X, padx=5, pady=5, before=self.start_button)
         else:
             self.quality_frame.pack_forget()
@@ -313,13 +155,17 @@ class TranslatorApp:
         self.log_text.config(state="normal"); self.log_text.delete(1.0, tk.END); self.log_text.config(state="disabled")
         target_lang_code = self.languages[self.lang_var.get()]
         mode = self.mode_var.get()
+        output_kind = "overlay" if self.overlay_var.get() else "raster"
         thread = None
         if mode == "structured":
             thread = threading.Thread(target=run_structured_translation_process, args=(input_path, target_lang_code, self.log, self.update_progress, lambda: self.set_ui_state(True)))
         elif mode == "visual":
             quality_dpi = self.quality_var.get()
             # Đổi hàm callback cho progress bar trong chế độ visual
-            thread = threading.Thread(target=run_visual_translation_process, args=(input_path, target_lang_code, quality_dpi, self.log, self.update_progress, lambda: self.set_ui_state(True)))
+            thread = threading.Thread(target=run_visual_translation_process, args=(input_path, target_lang_code, quality_dpi, self.log, self.update_progress, lambda: self.set_ui_state(True), output_kind))
+        elif mode == "auto":
+            # Trang scan trong chế độ tự động vẫn dùng mức chất lượng OCR đã chọn
+            thread = threading.Thread(target=run_auto_translation_process, args=(input_path, target_lang_code, self.quality_var.get(), self.log, self.update_progress, lambda: self.set_ui_state(True), output_kind))
         if thread:
             thread.daemon = True
             thread.start()
@@ -0,0 +1,225 @@
+import time
+import random
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from may_dich import pack_texts, unpack_text, PackMismatch
+
+# =====================================================================================
+# BỘ ĐIỀU PHỐI DỊCH: GỬI NHIỀU YÊU CẦU SONG SONG NHƯNG VẪN TÔN TRỌNG GIỚI HẠN TỐC ĐỘ
+# Mọi chế độ dịch đều gửi các gói cụm từ qua đây. Giới hạn số yêu cầu/giây và số ký
+# tự/phút được tính bằng token bucket, dùng chung giữa các luồng và (nếu tạo bằng
+# RateLimiter.shared) giữa các tiến trình.
+# =====================================================================================
+
+class RateLimiter:
+    """Token bucket cho số yêu cầu mỗi giây và số ký tự mỗi phút. Giá trị None = không giới hạn."""
+
+    def __init__(self, requests_per_second=None, chars_per_minute=None, _state=None, _lock=None):
+        self.requests_per_second = requests_per_second
+        self.chars_per_minute = chars_per_minute
+        # Trạng thái: [token yêu cầu, token ký tự, thời điểm nạp lại gần nhất]
+        if _state is None:
+            _state = [float(requests_per_second or 0), float(chars_per_minute or 0), time.monotonic()]
+        self._state = _state
+        self._lock = _lock if _lock is not None else threading.Lock()
+
+    @classmethod
+    def shared(cls, requests_per_second=None, chars_per_minute=None):
+        """Tạo bucket nằm trong bộ nhớ dùng chung, truyền được cho worker qua initargs của Pool."""
+        state = multiprocessing.Array('d', [float(requests_per_second or 0), float(chars_per_minute or 0), time.monotonic()], lock=False)
+        return cls(requests_per_second, chars_per_minute, _state=state, _lock=multiprocessing.Lock())
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._state[2])
+        if self.requests_per_second:
+            self._state[0] = min(float(self.requests_per_second), self._state[0] + elapsed * self.requests_per_second)
+        if self.chars_per_minute:
+            self._state[1] = min(float(self.chars_per_minute), self._state[1] + elapsed * self.chars_per_minute / 60.0)
+        self._state[2] = now
+
+    def acquire(self, chars=0):
+        """Chờ cho tới khi được phép gửi một yêu cầu chứa `chars` ký tự."""
+        # Một yêu cầu lớn hơn cả dung lượng bucket chỉ cần chờ bucket đầy
+        if self.chars_per_minute: chars = min(chars, self.chars_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = 0.0
+                if self.requests_per_second and self._state[0] < 1:
+                    wait = max(wait, (1 - self._state[0]) / self.requests_per_second)
+                if self.chars_per_minute and self._state[1] < chars:
+                    wait = max(wait, (chars - self._state[1]) * 60.0 / self.chars_per_minute)
+                if wait == 0.0:
+                    if self.requests_per_second: self._state[0] -= 1
+                    if self.chars_per_minute: self._state[1] -= chars
+                    return
+            time.sleep(wait)
+
+
+# Lỗi của deep_translator khi bị chặn tốc độ hoặc máy chủ lỗi (so theo tên để không phụ thuộc thư viện)
+TRANSIENT_ERROR_NAMES = {"TooManyRequests", "RequestError", "ServerException"}
+
+def is_transient_error(error):
+    """Lỗi mạng, máy chủ hoặc bị giới hạn tốc độ: chia nhỏ gói cũng không giúp được gì."""
+    if type(error).__name__ in TRANSIENT_ERROR_NAMES: return True
+    status = getattr(error, "code", None)
+    if not isinstance(status, int): status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int): return status == 429 or status >= 500
+    return isinstance(error, OSError)  # mất kết nối, hết thời gian chờ, lỗi DNS...
+
+
+class RetryPolicy:
+    """Thử lại với thời gian chờ tăng theo cấp số nhân, có jitter ngẫu nhiên để các luồng không dồn cùng lúc."""
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class TranslationDispatcher:
+    """
+    Chạy tối đa `max_in_flight` yêu cầu dịch cùng lúc trên một ThreadPool.
+    Mỗi luồng có engine riêng (tạo từ `translator_factory`) vì engine như
+    GoogleTranslator của deep_translator không an toàn khi dùng chung giữa các luồng.
+    `packed`: gộp cả gói vào một chuỗi (pack_texts) và gửi bằng translate_text, một yêu cầu mỗi gói.
+    """
+
+    def __init__(self, translator_factory, max_in_flight=4, rate_limiter=None, retry_policy=None, packed=False):
+        self.translator_factory = translator_factory
+        self.packed = packed
+        self.max_in_flight = max(1, max_in_flight)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dead_letters = []  # (cụm từ, lỗi cuối cùng) của những cụm từ không dịch được
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="dich")
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._requests = 0
+        self._segments = 0
+        self._chars = 0
+        self._retries = 0
+        self._pack_splits = 0
+        self._started = time.monotonic()
+
+    def _translator(self):
+        translator = getattr(self._local, "translator", None)
+        if translator is None:
+            translator = self._local.translator = self.translator_factory()
+        return translator
+
+    def _request(self, texts):
+        if self.packed: return self._request_packed(texts)
+        chars = sum(len(t) for t in texts)
+        self.rate_limiter.acquire(chars)
+        result = self._translator().translate_batch(list(texts))
+        if result is None or len(result) != len(texts):
+            raise ValueError(f"Engine trả về {0 if result is None else len(result)} bản dịch cho {len(texts)} cụm từ")
+        with self._stats_lock:
+            self._requests += 1
+            self._segments += len(texts)
+            self._chars += chars
+        return result
+
+    def _request_packed(self, texts):
+        """Một yêu cầu cho cả gói; bản dịch lệch mốc thì ném PackMismatch để gói được chia đôi."""
+        payload = texts[0] if len(texts) == 1 else pack_texts(texts)
+        self.rate_limiter.acquire(len(payload))
+        translated = self._translator().translate_text(payload)
+        with self._stats_lock:
+            self._requests += 1
+            self._chars += len(payload)
+        result = [translated] if len(texts) == 1 else unpack_text(translated, len(texts))
+        if result is None:
+            with self._stats_lock:
+                self._pack_splits += 1
+            raise PackMismatch(f"Bản dịch của gói {len(texts)} cụm từ không còn đủ mốc")
+        with self._stats_lock:
+            self._segments += len(texts)
+        return result
+
+    def _request_with_retry(self, texts, max_attempts):
+        for attempt in range(max_attempts):
+            try:
+                return self._request(texts)
+            except PackMismatch:
+                raise  # gửi lại nguyên gói cũng lệch như vậy, chia đôi ngay
+            except Exception:
+                if attempt == max_attempts - 1: raise
+                with self._stats_lock:
+                    self._retries += 1
+                time.sleep(self.retry_policy.delay(attempt))
+
+    def _translate_resilient(self, texts, max_attempts):
+        """
+        Dịch một gói; nếu vẫn lỗi sau khi thử lại thì chia đôi để cô lập cụm từ gây lỗi.
+        Lỗi mạng hoặc bị giới hạn tốc độ thì không chia đôi (chỉ làm tăng số yêu cầu lúc engine
+        đang quá tải): cả gói được đưa vào dead_letters để thử lại ở lượt cuối.
+        Cụm từ không dịch được (kể cả bản dịch rỗng) trả về None và được đưa vào dead_letters.
+        """
+        try:
+            result = [t if t else None for t in self._request_with_retry(texts, max_attempts)]
+        except Exception as e:
+            if len(texts) == 1 or is_transient_error(e):
+                with self._stats_lock:
+                    self.dead_letters.extend((text, repr(e)) for text in texts)
+                return [None] * len(texts)
+            # Lỗi tạm thời đã được thử lại ở cấp trên, các nửa nhỏ chỉ thử một lần
+            mid = len(texts) // 2
+            return self._translate_resilient(texts[:mid], 1) + self._translate_resilient(texts[mid:], 1)
+        # Bản dịch rỗng cũng là lỗi: không đưa vào dead_letters thì lượt thử lại sau cùng bỏ sót
+        empty = [text for text, t in zip(texts, result) if t is None]
+        if empty:
+            with self._stats_lock:
+                self.dead_letters.extend((text, "bản dịch rỗng") for text in empty)
+        return result
+
+    def _run(self, texts):
+        with self._stats_lock:
+            self._queued -= 1
+            self._in_flight += 1
+        try:
+            return self._translate_resilient(list(texts), self.retry_policy.max_attempts)
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+
+    def take_dead_letters(self):
+        """Lấy ra (và xóa) danh sách cụm từ lỗi để chạy một lượt thử lại sau cùng."""
+        with self._stats_lock:
+            texts = [text for text, _ in self.dead_letters]
+            self.dead_letters = []
+        return texts
+
+    def submit(self, texts):
+        """Đưa một gói cụm từ vào hàng đợi, trả về Future chứa danh sách bản dịch (None = chưa dịch được)."""
+        with self._stats_lock:
+            self._queued += 1
+        return self._executor.submit(self._run, texts)
+
+    def stats(self):
+        with self._stats_lock:
+            elapsed = max(1e-9, time.monotonic() - self._started)
+            return {
+                "queue_depth": self._queued,
+                "in_flight": self._in_flight,
+                "requests": self._requests,
+                "segments": self._segments,
+                "chars": self._chars,
+                "retries": self._retries,
+                "pack_splits": self._pack_splits,
+                "dead_letters": len(self.dead_letters),
+                "segments_per_sec": self._segments / elapsed,
+                "chars_per_sec": self._chars / elapsed,
+            }
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,714 @@
+import os
+import time
+import statistics
+import shutil
+import multiprocessing
+from concurrent.futures import as_completed
+
+# =====================================================================================
+# LÕI DỊCH TÀI LIỆU, KHÔNG PHỤ THUỘC GIAO DIỆN
+# Hai chế độ "cấu trúc" và "trực quan (OCR)" dùng chung bộ nhớ dịch, bộ điều phối dịch,
+# thư mục công việc và bộ đo thời gian. Giao diện Tkinter (dich_thuat_pro3.py) và dòng
+# lệnh (dich_thuat_cli.py) đều chỉ là lớp gọi vào các hàm translate_* ở đây.
+# =====================================================================================
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageDraw
+import pytesseract
+from may_dich import create_backend, get_backend_class, split_batches, packs_requests
+from bo_nho_dich import TranslationMemory, TM_FILE
+from ghi_pdf import image_to_pdf_bytes, merge_pdf_files, merge_pdf_pages, restore_from_origin
+from nhan_dang import ocr_words, ocr_engine_id, group_words, binarize, scale_boxes, PixelBuffer, OCR_LANG, OCR_SEGMENT_LEVEL
+from bo_nho_ocr import OcrCache, page_fingerprint, ocr_cache_key, OCR_CACHE_FILE
+from cong_viec import JobDirectory, write_file_atomic
+from trich_xuat import TextTable, extract_page_spans, iter_page_windows
+from dieu_phoi_dich import RateLimiter, TranslationDispatcher
+from theo_doi import trace_span, drain_spans, Tracer, EtaEstimator, merge_trace_files
+from ve_chu import draw_text_with_wrapping, preload_fonts
+from lop_phu import overlay_page
+from loc_cum_tu import load_filter
+
+# --- CẤU HÌNH QUAN TRỌNG ---
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+OCR_ENGINE = "auto"         # engine OCR: "tesserocr" (nạp một lần mỗi tiến trình), "pytesseract" hoặc "auto"
+# Ảnh đưa vào OCR được dựng riêng, tách khỏi ảnh đầu ra; tọa độ hộp chữ được đổi lại theo DPI đầu ra
+OCR_DPI = None              # None = bằng DPI đầu ra, một số cố định, hoặc "auto" (theo cỡ chữ và độ phân giải ảnh scan)
+OCR_GRAYSCALE = True        # ảnh xám một kênh: ít hơn 3 lần dữ liệu so với RGB
+OCR_BINARIZE_THRESHOLD = None  # 0-255 để nhị phân hóa ảnh OCR, None = giữ ảnh xám
+OCR_TARGET_TEXT_HEIGHT = 32    # "auto": chiều cao chữ mong muốn (điểm ảnh) cho Tesseract
+OCR_MIN_DPI, OCR_MAX_DPI = 150, 400
+OCR_CACHE_PATH = OCR_CACHE_FILE  # bộ nhớ đệm kết quả OCR dùng chung mọi ngôn ngữ đích; None để tắt
+OCR_CACHE_MAX_MB = 512
+# Trang trắng được chép nguyên, không OCR: ảnh thu nhỏ không có điểm nào tối hẳn hơn nền giấy.
+# Ở 36 DPI một số trang 9pt đã để lại vài điểm mực; trang scan chỉ có bụi thì vẫn được OCR (an toàn)
+BLANK_THUMBNAIL_DPI = 36      # None để tắt việc nhận biết trang trắng qua ảnh thu nhỏ
+BLANK_INK_CONTRAST = 32       # điểm ảnh tối hơn màu nền (trung vị) chừng này mức xám được tính là mực
+BLANK_MAX_INK_PIXELS = 0      # trang có nhiều điểm mực hơn số này thì không phải trang trắng
+FONT_PATH = "arial.ttf"
+ENGINE_NAME = "google"      # engine dịch: "google", "http" (máy chủ nội bộ) hoặc "stub" (offline)
+ENGINE_OPTIONS = {}         # tùy chọn riêng của engine, vd: {"url": "http://mt-server:5000/translate"}
+TRANSLATE_CHUNK_SIZE = 100  # số cụm từ gửi đi dịch mỗi lần
+MAX_IN_FLIGHT = 4           # số yêu cầu dịch chạy song song
+REQUESTS_PER_SECOND = 5     # giới hạn chung cho mọi luồng/tiến trình
+CHARS_PER_MINUTE = 200000
+DEAD_LETTER_RETRY_DELAY = 10  # giây chờ trước lượt thử lại các cụm từ lỗi
+# Cụm từ không cần dịch (số, dấu câu, URL, email, tên hàm...) được giữ nguyên, không gọi engine
+PASSTHROUGH_DEFAULTS = True   # dùng các quy tắc có sẵn trong loc_cum_tu.DEFAULT_RULES
+PASSTHROUGH_PATTERNS = []     # biểu thức chính quy riêng, vd: [r"REQ-\d+"]
+PASSTHROUGH_TERMS = []        # thuật ngữ luôn giữ nguyên, vd: ["PyMuPDF"]
+PASSTHROUGH_RULES_FILE = None # file JSON {"patterns": [...], "terms": [...], "defaults": true}
+TRACE_FORMAT = "jsonl"        # file đo thời gian từng trang/giai đoạn: "jsonl", "chrome" hoặc None để tắt
+JOB_WINDOW_PAGES = 25         # chế độ cấu trúc: số trang mỗi phần được lưu giữa chừng
+KEEP_JOB_DIR = False          # giữ lại thư mục công việc (*.job) sau khi dịch xong
+VISUAL_OUTPUT = "raster"      # chế độ trực quan: "raster" (vẽ lên ảnh trang) hoặc "overlay" (giữ trang gốc, phủ chữ vector)
+VISUAL_OUTPUTS = ("raster", "overlay")
+# Chế độ "auto": phân loại từng trang theo lượng chữ so với diện tích ảnh
+AUTO_MIN_TEXT_CHARS = 50      # trang có ít nhất chừng này ký tự trong lớp chữ được dịch theo cấu trúc
+AUTO_SCAN_IMAGE_COVERAGE = 0.85  # ảnh phủ gần kín trang = trang scan (lớp chữ nếu có chỉ là OCR ẩn)
+AUTO_IMAGE_COVERAGE = 0.3     # trang ít chữ nhưng ảnh chiếm nhiều diện tích thì cần OCR
+MODES = ("structured", "visual", "auto")
+
+def set_tesseract_cmd(path):
+    """Dùng đường dẫn đã cấu hình nếu có, nếu không thì tìm tesseract trong PATH (máy Linux/macOS)."""
+    pytesseract.pytesseract.tesseract_cmd = path if path and os.path.exists(path) else (shutil.which("tesseract") or path)
+
+set_tesseract_cmd(TESSERACT_CMD)
+
+# =====================================================================================
+# CÁC HÀM TIỆN ÍCH VÀ XỬ LÝ LÕI
+# =====================================================================================
+
+# Mỗi tiến trình giữ một kết nối riêng tới bộ nhớ dịch
+_translation_memory = None
+
+def get_translation_memory():
+    global _translation_memory
+    if _translation_memory is None: _translation_memory = TranslationMemory(TM_FILE)
+    return _translation_memory
+
+# Bucket giới hạn tốc độ nằm trong bộ nhớ dùng chung, worker nào cần dịch thì nhận qua initargs
+_rate_limiter = None
+
+def get_rate_limiter():
+    global _rate_limiter
+    if _rate_limiter is None: _rate_limiter = RateLimiter.shared(REQUESTS_PER_SECOND, CHARS_PER_MINUTE)
+    return _rate_limiter
+
+def set_rate_limiter(rate_limiter):
+    """Dùng một bucket có sẵn, vd khi nhiều tiến trình dịch nhiều file cùng lúc phải chung một giới hạn."""
+    global _rate_limiter
+    _rate_limiter = rate_limiter
+
+_segment_filter = None
+
+def get_segment_filter():
+    global _segment_filter
+    if _segment_filter is None:
+        _segment_filter = load_filter(PASSTHROUGH_RULES_FILE, PASSTHROUGH_PATTERNS, PASSTHROUGH_TERMS, PASSTHROUGH_DEFAULTS)
+    return _segment_filter
+
+def create_dispatcher(target_lang):
+    return TranslationDispatcher(lambda: create_backend(ENGINE_NAME, 'auto', target_lang, **ENGINE_OPTIONS), max_in_flight=MAX_IN_FLIGHT, rate_limiter=get_rate_limiter(),
+                                 packed=packs_requests(ENGINE_NAME, ENGINE_OPTIONS))
+
+def plan_chunks(texts, packed):
+    """Chia cụm từ thành các gói, mỗi gói là một yêu cầu dịch (khi không phải chia nhỏ vì lỗi)."""
+    backend_class = get_backend_class(ENGINE_NAME)
+    return split_batches(texts, min(TRANSLATE_CHUNK_SIZE, backend_class.max_batch_size), backend_class.max_chars, packed)
+
+def dispatch_chunks(texts, target_lang, memory, dispatcher, translation_cache, status_callback):
+    """Gửi các gói cụm từ qua bộ điều phối; chỉ bản dịch thành công mới được ghi vào bộ nhớ dịch."""
+    total_to_translate, translated_count = len(texts), 0
+    chunks = plan_chunks(texts, dispatcher.packed)
+    futures = {dispatcher.submit(chunk): index for index, chunk in enumerate(chunks)}
+    for future in as_completed(futures):
+        chunk = chunks[futures[future]]
+        new_translations = {original: translated for original, translated in zip(chunk, future.result()) if translated is not None}
+        translation_cache.update(new_translations)
+        memory.put_many(new_translations, 'auto', target_lang, ENGINE_NAME)
+        translated_count += len(chunk)
+        stats = dispatcher.stats()
+        status_callback(f"Đang dịch... ({translated_count}/{total_to_translate}) | Hàng đợi: {stats['queue_depth']} gói | {stats['segments_per_sec']:.1f} cụm/giây | Lỗi: {stats['dead_letters']}")
+
+def translate_unique_texts(unique_texts, target_lang, memory, dispatcher, status_callback):
+    """
+    Dịch một tập cụm từ không trùng lặp: bỏ qua cụm từ không cần dịch, tra bộ nhớ dịch, phần còn lại
+    gửi song song theo gói. Trả về (bản dịch, thống kê bộ lọc): thống kê gồm số cụm từ giữ nguyên,
+    số cụm từ theo từng quy tắc và ước tính số yêu cầu dịch đã tránh được (số gói mà riêng các cụm
+    từ đó chiếm, chia theo cùng giới hạn gói như khi gửi đi).
+    """
+    with trace_span("filter", segments=len(unique_texts)) as span:
+        to_translate, rules = get_segment_filter().split(unique_texts)
+        kept = set(to_translate)
+        skipped = [text for text in unique_texts if text not in kept]
+        passthrough = {"segments": len(skipped), "requests_saved": len(plan_chunks(skipped, dispatcher.packed)), "rules": dict(rules)}
+        span["passthrough"], span["requests_saved"] = passthrough["segments"], passthrough["requests_saved"]
+        unique_texts = to_translate
+    if skipped:
+        status_callback(f"Giữ nguyên {passthrough['segments']} cụm từ không cần dịch (số, ký hiệu, URL, mã...), "
+                        f"bớt khoảng {passthrough['requests_saved']} yêu cầu dịch.")
+    with trace_span("tm_lookup", segments=len(unique_texts)) as span:
+        translation_cache = memory.get_many(unique_texts, 'auto', target_lang, ENGINE_NAME)
+        span["cache_hits"] = len(translation_cache)
+        span["cache_misses"] = len(unique_texts) - len(translation_cache)
+    unique_texts_to_translate = [t for t in unique_texts if t not in translation_cache]
+    if unique_texts_to_translate:
+        status_callback(f"Bước 2: Chuẩn bị dịch {len(unique_texts_to_translate)} cụm từ mới...")
+        dispatch_chunks(unique_texts_to_translate, target_lang, memory, dispatcher, translation_cache, status_callback)
+        # Lượt thử lại sau cùng cho các cụm từ lỗi, thay vì bỏ chúng hoặc lưu bản gốc như một bản dịch
+        dead_letters = dispatcher.take_dead_letters()
+        if dead_letters:
+            status_callback(f"Thử lại {len(dead_letters)} cụm từ bị lỗi...")
+            time.sleep(DEAD_LETTER_RETRY_DELAY)
+            dispatch_chunks(dead_letters, target_lang, memory, dispatcher, translation_cache, status_callback)
+            still_failed = dispatcher.take_dead_letters()
+            if still_failed:
+                status_callback(f"Còn {len(still_failed)} cụm từ không dịch được, giữ nguyên văn bản gốc (không lưu vào bộ nhớ dịch).")
+    return translation_cache, passthrough
+
+def trace_path_for(output_path):
+    """Tên file đo thời gian cạnh file kết quả (tên file kết quả đã gồm chế độ và ngôn ngữ đích)."""
+    base, _ = os.path.splitext(output_path)
+    return f"{base}_trace.{'json' if TRACE_FORMAT == 'chrome' else 'jsonl'}"
+
+def write_trace(tracer, output_path):
+    if not TRACE_FORMAT: return None
+    return tracer.write(trace_path_for(output_path), TRACE_FORMAT)
+
+def _quiet(*args): pass
+
+def page_runs(pages):
+    """Chia danh sách số trang tăng dần thành các đoạn liên tiếp (đầu, cuối)."""
+    runs = []
+    for page_num in pages:
+        if runs and runs[-1][1] == page_num - 1: runs[-1][1] = page_num
+        else: runs.append([page_num, page_num])
+    return runs
+
+# --- BỘ XỬ LÝ CHO CHẾ ĐỘ "CẤU TRÚC" ---
+# Tài liệu được chia thành các shard JOB_WINDOW_PAGES trang liên tiếp. Mỗi shard được trích
+# chữ rồi tái tạo trong một tiến trình riêng với handle fitz riêng; các tiến trình dùng chung
+# một bảng dịch (gửi một lần lúc khởi tạo) và tiến trình cha ghép các shard lại theo thứ tự.
+# Worker tự ghi shard đã tái tạo vào thư mục công việc và chỉ gửi về đường dẫn, nên dữ liệu
+# PDF không đi qua đường ống kết quả của Pool.
+def map_shards(func, tasks, num_processes, initializer=None, initargs=(), ordered=False):
+    """Chạy `func` trên từng shard bằng Pool; chỉ một shard hoặc một tiến trình thì chạy ngay tại chỗ."""
+    tasks = list(tasks)
+    if num_processes <= 1 or len(tasks) <= 1:
+        if initializer: initializer(*initargs)
+        for task in tasks: yield func(task)
+        return
+    with multiprocessing.Pool(processes=min(num_processes, len(tasks)), initializer=initializer, initargs=initargs) as pool:
+        yield from (pool.imap if ordered else pool.imap_unordered)(func, tasks)
+
+def extract_shard(args):
+    """Trích các chuỗi chữ khác nhau của một shard, theo thứ tự xuất hiện."""
+    input_path, part_start, part_pages = args
+    table, segment_count = TextTable(), 0
+    with fitz.open(input_path) as doc:
+        for page_num in part_pages:
+            with trace_span("extract", page=page_num) as trace:
+                page_spans = extract_page_spans(doc[page_num], table)
+                segment_count += len(page_spans)
+                trace["spans"] = len(page_spans)
+    return (part_start, table.texts, segment_count, drain_spans())
+
+# Bảng dịch chỉ đọc, gửi một lần cho mỗi worker tái tạo lúc khởi tạo
+_rebuild_translations = {}
+
+def init_rebuild_worker(translations):
+    global _rebuild_translations
+    _rebuild_translations = translations
+    drain_spans()
+
+def rebuild_shard(args):
+    """
+    Tái tạo một shard thành file PDF riêng tại `artifact_path`, trả về đường dẫn cùng số trang.
+    Shard gồm cả tài liệu thì sửa thẳng trên bản mở của file gốc, giữ mọi thứ ở cấp tài liệu.
+    """
+    input_path, part_start, part_pages, artifact_path = args
+    table = TextTable()  # mã số chuỗi chỉ có nghĩa trong shard này
+    with fitz.open(input_path) as doc, fitz.open() as new_part:
+        part = doc if list(part_pages) == list(range(len(doc))) else new_part
+        if part is new_part:
+            for first, last in page_runs(part_pages): part.insert_pdf(doc, from_page=first, to_page=last)
+        for i, page in zip(part_pages, part):
+            with trace_span("rebuild", page=i) as trace:
+                redactions = 0
+                for span in extract_page_spans(page, table):
+                    translated_text = _rebuild_translations.get(table.texts[span.text_id])
+                    if translated_text is not None:
+                        page.add_redact_annot(span.bbox, text=translated_text, fontname=span.font, fontsize=span.size, text_color=span.color, align=fitz.TEXT_ALIGN_LEFT)
+                        redactions += 1
+                page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE)
+                trace["redactions"] = redactions
+        write_file_atomic(artifact_path, part.tobytes(garbage=3, deflate=True))
+    return (part_start, artifact_path, len(part_pages), drain_spans())
+
+def translate_structured(input_path, target_lang, status_callback=_quiet, progress_callback=_quiet, output_path=None, pages=None, num_processes=None):
+    """
+    Lõi của chế độ cấu trúc, không phụ thuộc giao diện. Trả về dict thống kê; lỗi được ném ra ngoài.
+    `pages` (tùy chọn): chỉ dịch các trang này, file kết quả chỉ gồm các trang đó theo thứ tự.
+    """
+    status_callback("--- BẮT ĐẦU DỊCH CẤU TRÚC (GIỮ ĐỊNH DẠNG) ---")
+    start_time, stage_seconds, tracer = time.time(), {}, Tracer()
+    with fitz.open(input_path) as doc:
+        page_count = len(doc)
+        toc, metadata = (doc.get_toc(simple=False) if pages is None else None), doc.metadata
+    selected = list(range(page_count)) if pages is None else sorted(pages)
+    job = JobDirectory.open(input_path, "structured", target_lang, engine=ENGINE_NAME, window=JOB_WINDOW_PAGES,
+                            pages=None if pages is None else selected)
+    try:
+        num_processes = num_processes or max(1, multiprocessing.cpu_count() - 1)
+        memory, dispatcher = get_translation_memory(), create_dispatcher(target_lang)
+        total_pages = len(selected)
+        windows = list(iter_page_windows(selected, JOB_WINDOW_PAGES))
+        progress_callback(0, total_pages)
+        status_callback(f"Bước 1: Thu thập toàn bộ văn bản từ tài liệu ({len(windows)} phần, {num_processes} nhân CPU)...")
+        stage_start = time.perf_counter()
+        # Lượt đầu chỉ gom chuỗi chữ vào bảng khử trùng lặp; span của từng trang được trích
+        # lại khi tái tạo shard chứa trang đó, nên bộ nhớ không tăng theo số trang
+        text_table, segment_count = TextTable(), 0
+        tracer.collect()  # chạy tại chỗ thì worker sẽ lấy span của tiến trình này
+        tasks = [(input_path, part_start, part_pages) for part_start, part_pages in windows]
+        for _, texts, count, spans in map_shards(extract_shard, tasks, num_processes, drain_spans, ordered=True):
+            for text in texts: text_table.add(text)
+            segment_count += count
+            tracer.collect(spans)
+        stage_seconds["extract"] = time.perf_counter() - stage_start
+        stage_start = time.perf_counter()
+        # Khi chạy tiếp, các cụm từ đã dịch đều có sẵn trong bộ nhớ dịch nên bước này rất nhanh
+        unique_texts = text_table.texts
+        try:
+            with trace_span("translate", segments=len(unique_texts)) as trace:
+                translation_cache, passthrough = translate_unique_texts(unique_texts, target_lang, memory, dispatcher, status_callback)
+                trace["requests"] = dispatcher.stats()["requests"]
+        finally:
+            dispatcher.close()
+        translation_map = {text: translation_cache[text] for text in unique_texts if translation_cache.get(text) is not None}
+        stage_seconds["translate"] = time.perf_counter() - stage_start
+        status_callback("Bước 3: Bắt đầu tái tạo lại các trang...")
+        stage_start = time.perf_counter()
+        # Mỗi shard được tái tạo thành tài liệu riêng và lưu vào thư mục công việc ngay khi xong
+        part_starts = [part_start for part_start, _ in windows]
+        done_parts = dict(job.done("rebuild"))
+        resumed_pages = sum(entry["pages"] for entry in done_parts.values())
+        if resumed_pages:
+            status_callback(f"Tiếp tục công việc dở dang: đã có {resumed_pages}/{total_pages} trang từ lần chạy trước.")
+            progress_callback(resumed_pages, total_pages)
+        eta = EtaEstimator(tracer, total_pages, ["rebuild"], parallelism=num_processes, already_done={"rebuild": resumed_pages})
+        completed_count = resumed_pages
+        tracer.collect()
+        tasks = [(input_path, part_start, part_pages, job.artifact_path("rebuild", part_start))
+                 for _, part_start, part_pages in tasks if part_start not in done_parts]
+        for part_start, artifact_path, part_page_count, spans in map_shards(rebuild_shard, tasks, num_processes, init_rebuild_worker, (translation_map,)):
+            tracer.collect(spans)
+            job.record_artifact("rebuild", part_start, artifact_path, pages=part_page_count)
+            completed_count += part_page_count
+            progress_callback(completed_count, total_pages)
+            status_callback(f"Đã tái tạo {completed_count}/{total_pages} trang | Còn lại: {eta.format()}")
+        stage_seconds["rebuild"] = time.perf_counter() - stage_start
+        stage_start = time.perf_counter()
+        if not output_path:
+            base, _ = os.path.splitext(input_path)
+            output_path = f"{base}_translated_structured.pdf"
+        with trace_span("save") as trace:
+            # Mục lục chỉ còn đúng khi giữ nguyên mọi trang
+            merge_pdf_files([job.artifact("rebuild", start) for start in part_starts], output_path,
+                            toc=toc, metadata=metadata, origin=(input_path, selected), garbage=4, deflate=True, clean=True)
+            trace["bytes"] = os.path.getsize(output_path)
+        stage_seconds["save"] = time.perf_counter() - stage_start
+        job.finish(keep=KEEP_JOB_DIR)
+    finally:
+        job.close()  # lỗi giữa chừng: giữ thư mục công việc để lần sau chạy tiếp
+    elapsed = time.time() - start_time
+    trace_path = write_trace(tracer, output_path)
+    status_callback(f"--- HOÀN THÀNH sau {elapsed:.2f} giây! ---")
+    return {"mode": "structured", "output_path": output_path, "pages": total_pages, "segments": segment_count,
+            "unique_segments": len(unique_texts), "translation_requests": dispatcher.stats()["requests"],
+            "passthrough_segments": passthrough["segments"], "passthrough_rules": passthrough["rules"],
+            "passthrough_requests_saved": passthrough["requests_saved"],
+            "resumed_pages": resumed_pages, "stage_seconds": stage_seconds, "stage_totals": tracer.stage_summary(),
+            "trace_path": trace_path, "elapsed": elapsed}
+
+# --- BỘ XỬ LÝ CHO CHẾ ĐỘ "TRỰC QUAN (OCR)" ---
+# Chế độ trực quan chạy theo 3 giai đoạn tách biệt:
+#   1. OCR song song mọi trang, mỗi trang trả về danh sách hộp chữ gọn
+#   2. Gom các cụm từ không trùng lặp của CẢ tài liệu và dịch một lượt theo gói lớn
+#   3. Vẽ lại song song từ bảng dịch đã hoàn tất
+def render_page_image(input_path, page_num, quality_dpi):
+    with trace_span("rasterize", page=page_num) as span:
+        with fitz.open(input_path) as doc:
+            pix = doc.load_page(page_num).get_pixmap(dpi=quality_dpi)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        span["bytes"] = len(pix.samples_mv)
+    return img
+
+def ocr_profile():
+    """Cấu hình OCR hiện tại, gửi cho worker lúc khởi tạo (tiến trình spawn không thấy giá trị đã sửa ở tiến trình cha)."""
+    return {"engine": OCR_ENGINE, "tesseract_cmd": pytesseract.pytesseract.tesseract_cmd, "dpi": OCR_DPI, "grayscale": OCR_GRAYSCALE, "binarize": OCR_BINARIZE_THRESHOLD,
+            "text_height": OCR_TARGET_TEXT_HEIGHT, "min_dpi": OCR_MIN_DPI, "max_dpi": OCR_MAX_DPI,
+            "cache": OCR_CACHE_PATH and os.path.abspath(OCR_CACHE_PATH), "cache_max_mb": OCR_CACHE_MAX_MB}
+
+def choose_ocr_dpi(page, quality_dpi, profile):
+    """DPI cho ảnh OCR của một trang theo cấu hình; "auto" dựa vào cỡ chữ và độ phân giải gốc của ảnh scan."""
+    if profile["dpi"] is None: return quality_dpi
+    if profile["dpi"] != "auto": return int(profile["dpi"])
+    candidates = []
+    # Lớp chữ (kể cả lớp OCR ẩn của file scan) cho biết cỡ chữ thân bài
+    sizes = [span.size for span in extract_page_spans(page, TextTable()) if span.size > 0]
+    if sizes: candidates.append(profile["text_height"] * 72.0 / statistics.median(sizes))
+    # Dựng ảnh scan vượt độ phân giải gốc không thêm chi tiết nào cho OCR
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        if bbox.width > 0 and abs(bbox & page.rect) >= AUTO_SCAN_IMAGE_COVERAGE * abs(page.rect):
+            candidates.append(info["width"] * 72.0 / bbox.width)
+    dpi = min(candidates) if candidates else quality_dpi
+    return int(max(profile["min_dpi"], min(profile["max_dpi"], dpi)))
+
+def is_blank_page(page):
+    """Trang trắng: không có chữ, hình vẽ hay ảnh nào; hoặc ảnh thu nhỏ không có điểm mực nào."""
+    if page.get_text("text").strip(): return False
+    if not page.get_images() and not page.get_drawings(): return True
+    if not BLANK_THUMBNAIL_DPI: return False
+    thumb = page.get_pixmap(dpi=BLANK_THUMBNAIL_DPI, colorspace=fitz.csGRAY)
+    # So với màu nền thay vì một mức cố định: giấy scan ngả xám vẫn là trang trắng
+    samples = thumb.samples
+    ink_level = statistics.median_low(samples) - BLANK_INK_CONTRAST
+    ink = sum(1 for value in samples if value < ink_level)
+    return ink <= BLANK_MAX_INK_PIXELS
+
+def prescan_pages(input_path, pages):
+    """
+    Dấu vân tay từng trang; trả về {trang: trang đại diện}, trang đại diện là trang đầu tiên có cùng
+    nội dung đã phân giải (kể cả Form XObject, chú thích và giá trị ô biểu mẫu, xem page_fingerprint).
+    """
+    first_by_fingerprint, representative = {}, {}
+    with fitz.open(input_path) as doc:
+        for page_num in pages:
+            representative[page_num] = first_by_fingerprint.setdefault(page_fingerprint(doc[page_num]), page_num)
+    return representative
+
+# Cấu hình OCR của worker, nhận một lần lúc khởi tạo; mỗi worker tự mở kết nối tới bộ nhớ đệm OCR
+_ocr_profile, _ocr_cache = None, None
+
+def get_ocr_cache(profile):
+    global _ocr_cache
+    if not profile["cache"]: return None
+    if _ocr_cache is None or _ocr_cache.db_path != profile["cache"]:
+        _ocr_cache = OcrCache(profile["cache"], profile["cache_max_mb"] * 1024 * 1024)
+    return _ocr_cache
+
+def init_ocr_worker(profile=None):
+    global _ocr_profile
+    _ocr_profile = profile or ocr_profile()
+    # Đường dẫn tesseract đặt ở tiến trình cha (vd --tesseract của dòng lệnh) không theo sang tiến trình spawn
+    set_tesseract_cmd(_ocr_profile["tesseract_cmd"])
+    drain_spans()  # bỏ các span kế thừa từ tiến trình cha khi fork
+
+def ocr_single_page(args):
+    page_num, input_path, quality_dpi = args
+    profile = _ocr_profile or ocr_profile()
+    cache, cache_key, words = get_ocr_cache(profile), None, None
+    with fitz.open(input_path) as doc:
+        page = doc.load_page(page_num)
+        with trace_span("blank_check", page=page_num) as span:
+            blank = span["blank"] = is_blank_page(page)
+        if blank: return (page_num, [], "blank", drain_spans())
+        ocr_dpi = choose_ocr_dpi(page, quality_dpi, profile)
+        if cache:
+            with trace_span("ocr_cache", page=page_num) as span:
+                cache_key = ocr_cache_key(page_fingerprint(page), ocr_dpi, OCR_LANG, ocr_engine_id(engine=profile["engine"]),
+                                          grayscale=profile["grayscale"], binarize=profile["binarize"])
+                words = cache.get(cache_key)
+                span["hit"] = words is not None
+        if words is None:
+            with trace_span("rasterize", page=page_num) as span:
+                pix = page.get_pixmap(dpi=ocr_dpi, colorspace=fitz.csGRAY if profile["grayscale"] else fitz.csRGB)
+                span["bytes"], span["dpi"] = len(pix.samples_mv), ocr_dpi
+    source = "ocr" if words is None else "cache"
+    if words is None:
+        with trace_span("ocr", page=page_num) as span:
+            # Bộ đệm điểm ảnh của PyMuPDF đi thẳng vào engine OCR, không qua ảnh PIL hay file tạm
+            pixels = PixelBuffer(pix.samples, pix.width, pix.height, pix.n, pix.stride)
+            if profile["binarize"] is not None: pixels = binarize(pixels, profile["binarize"])
+            words = ocr_words(pixels, engine=profile["engine"])
+            span["words"] = len(words["text"])
+        if cache: cache.put(cache_key, words)
+    boxes = scale_boxes(group_words(words), quality_dpi / ocr_dpi)
+    # Span đo được gửi về tiến trình cha cùng kết quả trang
+    return (page_num, boxes, source, drain_spans())
+
+# Bảng dịch chỉ đọc và font, gửi/nạp một lần cho mỗi worker vẽ lúc khởi tạo
+_render_translations, _render_font_path = {}, None
+
+def init_render_worker(translations, font_path):
+    global _render_translations, _render_font_path
+    _render_translations, _render_font_path = translations, font_path
+    preload_fonts(font_path)
+    drain_spans()
+
+def render_single_page(args):
+    """Vẽ bản dịch lên ảnh trang, nén thành PDF một trang và ghi thẳng vào `artifact_path`."""
+    page_num, input_path, quality_dpi, boxes, artifact_path = args
+    font_path = _render_font_path
+    img = render_page_image(input_path, page_num, quality_dpi)
+    with trace_span("render", page=page_num, boxes=len(boxes)) as span:
+        draw = ImageDraw.Draw(img)
+        hits = 0
+        for x, y, w, h, original_text in boxes:
+            translated_text = _render_translations.get(original_text)
+            if translated_text is None: translated_text = original_text
+            else: hits += 1
+            draw.rectangle([x, y, x + w, y + h], fill='white', outline='white')
+            draw_text_with_wrapping(draw, translated_text, (x, y, w, h), font_path)
+        span["cache_hits"], span["cache_misses"] = hits, len(boxes) - hits
+    with trace_span("encode", page=page_num) as span:
+        data = image_to_pdf_bytes(img, quality_dpi)
+        write_file_atomic(artifact_path, data)
+        span["bytes"] = len(data)
+    # Chỉ gửi về đường dẫn: ảnh trang không bao giờ đi qua đường ống kết quả của Pool
+    return (page_num, artifact_path, drain_spans())
+
+def write_overlay_pdf(input_path, selected, boxes_by_page, translations, quality_dpi, output_path, with_toc, on_page=_quiet):
+    """
+    Chép các trang gốc đã chọn sang file đích và phủ bản dịch dạng vector lên từng trang.
+    Dịch cả tài liệu thì phủ thẳng lên bản mở của file gốc, giữ mọi thứ ở cấp tài liệu.
+    """
+    with fitz.open(input_path) as doc, fitz.open() as new_out:
+        whole = selected == list(range(len(doc)))
+        out = doc if whole else new_out
+        if not whole:
+            for first, last in page_runs(selected): out.insert_pdf(doc, from_page=first, to_page=last)
+        for page_num, page in zip(selected, out):
+            boxes = boxes_by_page[page_num]
+            with trace_span("overlay", page=page_num, boxes=len(boxes)) as span:
+                hits = overlay_page(page, boxes, translations, quality_dpi, FONT_PATH)
+                span["cache_hits"], span["cache_misses"] = hits, len(boxes) - hits
+            on_page(page_num)
+        if len(out) == 0: return False
+        if not whole:
+            restore_from_origin(out, input_path, selected)
+            if with_toc: out.set_toc(doc.get_toc(simple=False))
+            out.set_metadata(doc.metadata)
+        out.subset_fonts()  # chỉ nhúng các glyph đã dùng thay vì cả file font
+        out.save(output_path + ".tmp", garbage=3, deflate=True)
+    os.replace(output_path + ".tmp", output_path)
+    return True
+
+def translate_visual(input_path, target_lang, quality_dpi, status_callback=_quiet, progress_callback=_quiet, output_path=None, num_processes=None, pages=None,
+                     output_kind=None):
+    """
+    Lõi của chế độ trực quan, không phụ thuộc giao diện. Trả về dict thống kê; lỗi được ném ra ngoài.
+    `pages` (tùy chọn): chỉ dịch các trang này, file kết quả chỉ gồm các trang đó theo thứ tự.
+    `output_kind` (mặc định VISUAL_OUTPUT): "raster" vẽ lại cả trang thành ảnh, "overlay" giữ trang gốc và phủ chữ vector.
+    """
+    output_kind = output_kind or VISUAL_OUTPUT
+    if output_kind not in VISUAL_OUTPUTS: raise ValueError(f"Kiểu xuất không hợp lệ: '{output_kind}'. Các kiểu hiện có: {', '.join(VISUAL_OUTPUTS)}")
+    start_time, stage_seconds, tracer = time.time(), {}, Tracer()
+    with fitz.open(input_path) as doc: page_count = len(doc)
+    selected = list(range(page_count)) if pages is None else sorted(pages)
+    total_pages = len(selected)
+    # Kết quả OCR (trong nhật ký) và từng trang đã vẽ (PDF một trang) được lưu ngay khi xong
+    job = JobDirectory.open(input_path, "visual", target_lang, engine=ENGINE_NAME, dpi=quality_dpi, segment_level=OCR_SEGMENT_LEVEL,
+                            ocr={k: v for k, v in ocr_profile().items() if not k.startswith("cache") and k != "tesseract_cmd"}, output=output_kind, pages=None if pages is None else selected)
+    try:
+        num_processes = num_processes or max(1, multiprocessing.cpu_count() - 1)
+        progress_callback(0, 2 * total_pages)
+        ocr_done, render_done = dict(job.done("ocr")), dict(job.done("render"))
+        if job.resumed:
+            status_callback(f"Tiếp tục công việc dở dang: đã OCR {len(ocr_done)} trang, đã vẽ {len(render_done)} trang.")
+
+        # Trang giống hệt nhau (cùng dấu vân tay nội dung) chỉ được OCR và vẽ một lần
+        stage_start = time.perf_counter()
+        with trace_span("prescan", pages=total_pages) as trace:
+            representative = prescan_pages(input_path, selected)
+            copies = {page_num: first for page_num, first in representative.items() if page_num != first}
+            trace["duplicates"] = len(copies)
+        if copies: status_callback(f"{len(copies)} trang trùng lặp với trang trước đó, sẽ dùng lại kết quả.")
+        status_callback(f"Bước 1: OCR {total_pages - len(copies)} trang trên {num_processes} nhân CPU...")
+        boxes_by_page = {}
+        for page_num, entry in ocr_done.items(): boxes_by_page[page_num] = [tuple(box) for box in entry["boxes"]]
+        completed_count = len(ocr_done)
+        progress_callback(completed_count, 2 * total_pages)
+        final_stage = "render" if output_kind == "raster" else "overlay"
+        unique_done = sum(1 for page_num in ocr_done if page_num not in copies)
+        eta = EtaEstimator(tracer, total_pages - len(copies), ["rasterize", "ocr", final_stage], parallelism=num_processes,
+                           already_done={"rasterize": unique_done, "ocr": unique_done, final_stage: len(render_done)})
+        sources, blank_pages = {"ocr": 0, "cache": 0, "blank": 0}, []
+        with multiprocessing.Pool(processes=num_processes, initializer=init_ocr_worker, initargs=(ocr_profile(),)) as pool:
+            tasks = ((i, input_path, quality_dpi) for i in selected if i not in ocr_done and i not in copies)
+            for page_num, boxes, source, spans in pool.imap_unordered(ocr_single_page, tasks):
+                boxes_by_page[page_num] = boxes
+                job.record("ocr", page_num, boxes=boxes)
+                tracer.collect(spans)
+                sources[source] += 1
+                if source == "blank": blank_pages.append(page_num + 1)
+                # Trang lấy từ bộ nhớ đệm hay trang trắng không dựng ảnh, không OCR (trang trắng cũng không vẽ lại)
+                if source != "ocr": eta.mark_done(["rasterize", "ocr"] + ([final_stage] if source == "blank" and output_kind == "raster" else []))
+                completed_count += 1
+                progress_callback(completed_count, 2 * total_pages)
+                note = {"cache": " (bộ nhớ đệm)", "blank": " (trang trắng)"}.get(source, "")
+                status_callback(f"Đã OCR xong trang {page_num + 1}/{page_count}{note} | Còn lại: {eta.format()}")
+        for page_num, first in copies.items():
+            if page_num in ocr_done: continue
+            boxes_by_page[page_num] = boxes_by_page[first]
+            job.record("ocr", page_num, boxes=boxes_by_page[first], copy_of=first)
+            completed_count += 1
+        progress_callback(completed_count, 2 * total_pages)
+        if sources["cache"]: status_callback(f"{sources['cache']} trang lấy kết quả OCR từ bộ nhớ đệm, không phải OCR lại.")
+        if blank_pages: status_callback(f"{len(blank_pages)} trang trắng được giữ nguyên, không OCR: trang {', '.join(map(str, sorted(blank_pages)))}.")
+        stage_seconds["ocr"] = time.perf_counter() - stage_start
+
+        # Dịch một lượt cho cả tài liệu: tiêu đề, chân trang, thuật ngữ lặp lại chỉ dịch một lần
+        stage_start = time.perf_counter()
+        unique_texts = list({box[4] for boxes in boxes_by_page.values() for box in boxes})
+        total_boxes = sum(len(boxes) for boxes in boxes_by_page.values())
+        status_callback(f"Tìm thấy {total_boxes} hộp chữ, {len(unique_texts)} cụm từ khác nhau.")
+        memory, dispatcher = get_translation_memory(), create_dispatcher(target_lang)
+        try:
+            with trace_span("translate", segments=len(unique_texts)) as trace:
+                translation_map, passthrough = translate_unique_texts(unique_texts, target_lang, memory, dispatcher, status_callback)
+                trace["requests"] = dispatcher.stats()["requests"]
+        finally:
+            dispatcher.close()
+        stage_seconds["translate"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        if not output_path:
+            base, _ = os.path.splitext(input_path)
+            output_path = f"{base}_translated_visual.pdf"
+        trace_base = output_path
+        if output_kind == "overlay":
+            # Không vẽ lại ảnh trang: chỉ chép trang gốc và phủ chữ, đủ nhanh để chạy ngay trong tiến trình này
+            status_callback("Bước 3: Phủ bản dịch dạng vector lên các trang gốc...")
+            def on_page(page_num):
+                nonlocal completed_count
+                completed_count += 1
+                progress_callback(completed_count, 2 * total_pages)
+            with trace_span("save") as trace:
+                if not write_overlay_pdf(input_path, selected, boxes_by_page, translation_map, quality_dpi, output_path, pages is None, on_page):
+                    output_path = None
+                trace["bytes"] = os.path.getsize(output_path) if output_path else 0
+            stage_seconds["overlay"] = time.perf_counter() - stage_start
+        else:
+            # Worker vẽ, nén và ghi mỗi trang thành PDF một trang trong thư mục công việc; tiến trình cha
+            # chỉ nhận đường dẫn và ghi nhật ký, nên CPU và bộ nhớ của nó không tăng theo số worker.
+            # Trang không có chữ nào được chép nguyên từ file gốc, trang trùng lặp dùng lại trang đã vẽ.
+            to_render = [i for i in selected if i not in copies and boxes_by_page[i]]
+            completed_count += total_pages - len(to_render) + len(render_done)
+            # Trang OCR không thấy chữ cũng được chép nguyên (trang trắng đã được tính lúc OCR)
+            eta.mark_done([final_stage], sum(1 for i in selected if i not in copies and not boxes_by_page[i]) - len(blank_pages))
+            progress_callback(completed_count, 2 * total_pages)
+            status_callback("Bước 3: Tái tạo lại các trang đã dịch...")
+            with multiprocessing.Pool(processes=num_processes, initializer=init_render_worker, initargs=(translation_map, FONT_PATH)) as pool:
+                tasks = [(i, input_path, quality_dpi, boxes_by_page[i], job.artifact_path("render", i)) for i in to_render if i not in render_done]
+                for page_num, artifact_path, spans in pool.imap_unordered(render_single_page, tasks):
+                    tracer.collect(spans)
+                    job.record_artifact("render", page_num, artifact_path)
+                    completed_count += 1
+                    progress_callback(completed_count, 2 * total_pages)
+                    status_callback(f"Đã xử lý xong trang {page_num + 1}/{page_count} | Còn lại: {eta.format()}")
+            stage_seconds["render"] = time.perf_counter() - stage_start
+
+            status_callback("Đang hoàn tất file PDF mới...")
+            stage_start = time.perf_counter()
+            with trace_span("save") as trace:
+                page_sources = [(input_path, i) if not boxes_by_page[i] else (job.artifact("render", representative[i]), 0) for i in selected]
+                if not merge_pdf_pages([source for source in page_sources if source[0]], output_path, origin=(input_path, selected)): output_path = None
+                trace["bytes"] = os.path.getsize(output_path) if output_path else 0
+            stage_seconds["save"] = time.perf_counter() - stage_start
+        job.finish(keep=KEEP_JOB_DIR)
+        elapsed = time.time() - start_time
+        trace_path = write_trace(tracer, trace_base)
+        if output_path: status_callback(f"--- HOÀN THÀNH! Đã lưu vào: {output_path} ---")
+        return {"mode": "visual", "output_kind": output_kind, "output_path": output_path, "pages": total_pages, "segments": total_boxes,
+                "unique_segments": len(unique_texts), "translation_requests": dispatcher.stats()["requests"],
+                "passthrough_segments": passthrough["segments"], "passthrough_rules": passthrough["rules"],
+                "passthrough_requests_saved": passthrough["requests_saved"],
+                "resumed_pages": len(render_done) if output_kind == "raster" else len(ocr_done), "ocr_cache_hits": sources["cache"],
+                "blank_pages": sources["blank"], "duplicate_pages": len(copies), "stage_seconds": stage_seconds,
+                "stage_totals": tracer.stage_summary(), "trace_path": trace_path, "elapsed": elapsed}
+    finally:
+        job.close()  # lỗi giữa chừng: giữ thư mục công việc để lần sau chạy tiếp
+
+# --- CHẾ ĐỘ "TỰ ĐỘNG": CHỌN CÁCH DỊCH CHO TỪNG TRANG ---
+def classify_page(page):
+    """Trả về "structured" nếu lớp chữ của trang dùng được, "visual" nếu trang cần OCR."""
+    text_chars = len(page.get_text("text").strip())
+    page_area = abs(page.rect) or 1.0
+    image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    image_coverage = min(1.0, image_area / page_area)
+    if image_coverage >= AUTO_SCAN_IMAGE_COVERAGE: return "visual"
+    if text_chars >= AUTO_MIN_TEXT_CHARS: return "structured"
+    if image_coverage >= AUTO_IMAGE_COVERAGE: return "visual"
+    return "structured"  # trang trống hoặc gần trống: đường rẻ nhất
+
+def classify_pages(input_path):
+    with fitz.open(input_path) as doc:
+        return [classify_page(page) for page in doc]
+
+def translate_auto(input_path, target_lang, quality_dpi, status_callback=_quiet, progress_callback=_quiet, output_path=None, num_processes=None,
+                   output_kind=None):
+    """
+    Dịch tài liệu hỗn hợp: trang có lớp chữ đi đường cấu trúc (nhanh, giữ định dạng),
+    trang scan/ảnh đi đường OCR; kết quả hai đường được ghép lại theo đúng thứ tự trang.
+    """
+    start_time = time.time()
+    status_callback("--- BẮT ĐẦU DỊCH TỰ ĐỘNG (CHỌN CHẾ ĐỘ THEO TỪNG TRANG) ---")
+    page_modes = classify_pages(input_path)
+    pages_by_mode = {mode: [i for i, m in enumerate(page_modes) if m == mode] for mode in ("structured", "visual")}
+    status_callback(f"Phân loại: {len(pages_by_mode['structured'])} trang có lớp chữ, {len(pages_by_mode['visual'])} trang cần OCR.")
+    # Thanh tiến độ chung: mỗi trang cấu trúc 1 bước, mỗi trang OCR 2 bước (OCR + vẽ)
+    total_steps = len(pages_by_mode["structured"]) + 2 * len(pages_by_mode["visual"])
+    base, _ = os.path.splitext(input_path)
+    if not output_path: output_path = f"{base}_translated_auto.pdf"
+    results, part_paths, offset, auto_path = {}, {}, 0, output_path
+    try:
+        for mode in ("structured", "visual"):
+            if not pages_by_mode[mode]: continue
+            part_paths[mode] = f"{os.path.splitext(output_path)[0]}_{mode}_part.pdf"
+            step_offset = offset
+            sub_progress = lambda value, maximum, step_offset=step_offset: progress_callback(step_offset + value, total_steps)
+            if mode == "structured":
+                results[mode] = translate_structured(input_path, target_lang, status_callback, sub_progress, part_paths[mode], pages=pages_by_mode[mode], num_processes=num_processes)
+            else:
+                results[mode] = translate_visual(input_path, target_lang, quality_dpi, status_callback, sub_progress, part_paths[mode], num_processes, pages=pages_by_mode[mode],
+                                                 output_kind=output_kind)
+            offset += len(pages_by_mode[mode]) * (1 if mode == "structured" else 2)
+        status_callback("Đang ghép các trang thành file PDF cuối cùng...")
+        position = {mode: {page_num: i for i, page_num in enumerate(pages)} for mode, pages in pages_by_mode.items()}
+        kept = [page_num for page_num, mode in enumerate(page_modes) if results.get(mode, {}).get("output_path")]
+        sources = [(results[page_modes[page_num]]["output_path"], position[page_modes[page_num]][page_num]) for page_num in kept]
+        with fitz.open(input_path) as doc: toc, metadata = doc.get_toc(simple=False), doc.metadata
+        if not merge_pdf_pages(sources, output_path, toc=toc, metadata=metadata, origin=(input_path, kept), garbage=4, deflate=True): output_path = None
+        # Trace của từng phần được gộp thành một file theo tên file kết quả tự động
+        part_traces = [r["trace_path"] for r in results.values() if r.get("trace_path")]
+        trace_path = merge_trace_files(part_traces, trace_path_for(auto_path), TRACE_FORMAT) if part_traces else None
+    finally:
+        for path in list(part_paths.values()) + [r["trace_path"] for r in results.values() if r.get("trace_path")]:
+            if os.path.exists(path): os.remove(path)
+    elapsed = time.time() - start_time
+    status_callback(f"--- HOÀN THÀNH sau {elapsed:.2f} giây! ---")
+    return {"mode": "auto", "output_path": output_path, "pages": len(page_modes),
+            "page_modes": {mode: len(pages) for mode, pages in pages_by_mode.items()},
+            "segments": sum(r["segments"] for r in results.values()),
+            "unique_segments": sum(r["unique_segments"] for r in results.values()),
+            "passthrough_segments": sum(r["passthrough_segments"] for r in results.values()),
+            "passthrough_requests_saved": sum(r["passthrough_requests_saved"] for r in results.values()),
+            "translation_requests": sum(r["translation_requests"] for r in results.values()),
+            "resumed_pages": sum(r["resumed_pages"] for r in results.values()),
+            "stage_seconds": {f"{mode}.{stage}": seconds for mode, r in results.items() for stage, seconds in r["stage_seconds"].items()},
+            "by_mode": {mode: {k: v for k, v in r.items() if k not in ("stage_totals", "trace_path")} for mode, r in results.items()},
+            "trace_path": trace_path, "elapsed": elapsed}
+
+def translate_document(input_path, mode, target_lang, quality_dpi=200, status_callback=_quiet, progress_callback=_quiet, output_path=None, num_processes=None,
+                       output_kind=None):
+    """Dịch một file theo chế độ đã chọn. Trả về dict thống kê của chế độ đó."""
+    if mode == "structured":
+        return translate_structured(input_path, target_lang, status_callback, progress_callback, output_path, num_processes=num_processes)
+    if mode == "visual":
+        return translate_visual(input_path, target_lang, quality_dpi, status_callback, progress_callback, output_path, num_processes, output_kind=output_kind)
+    if mode == "auto":
+        return translate_auto(input_path, target_lang, quality_dpi, status_callback, progress_callback, output_path, num_processes, output_kind)
+    raise ValueError(f"Chế độ dịch không hợp lệ: '{mode}'. Các chế độ hiện có: {', '.join(MODES)}")
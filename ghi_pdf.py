@@ -0,0 +1,180 @@
+import os
+
+import fitz  # PyMuPDF
+
+# =====================================================================================
+# BỘ GHI PDF DẠNG LUỒNG CHO CHẾ ĐỘ TRỰC QUAN (OCR)
+# Mỗi trang ảnh được nén vào file PDF đích ngay khi xong, thay vì giữ toàn bộ ảnh
+# trong RAM tới cuối. Kết quả về không theo thứ tự (imap_unordered) được xếp lại
+# trong một bộ đệm có kích thước cố định. Khi chạy có thư mục công việc (cong_viec.py),
+# mỗi trang được lưu thành một file PDF riêng và ghép lại bằng merge_pdf_files ở cuối.
+# =====================================================================================
+
+def _insert_image_page(doc, img, dpi):
+    if img.mode != "RGB": img = img.convert("RGB")
+    # Đưa thẳng buffer điểm ảnh vào PyMuPDF, ảnh được nén Flate trong tài liệu đích
+    pix = fitz.Pixmap(fitz.csRGB, img.width, img.height, img.tobytes(), False)
+    scale = 72.0 / dpi
+    page = doc.new_page(width=img.width * scale, height=img.height * scale)
+    page.insert_image(page.rect, pixmap=pix)
+
+
+def image_to_pdf_bytes(img, dpi):
+    """Nén một ảnh trang thành PDF một trang (dùng cho file trang lưu giữa chừng)."""
+    doc = fitz.open()
+    try:
+        _insert_image_page(doc, img, dpi)
+        return doc.tobytes(garbage=3, deflate=True)
+    finally:
+        doc.close()
+
+
+def restore_internal_links(doc, source, source_pages):
+    """
+    insert_pdf bỏ các liên kết trỏ tới trang nằm ngoài phần được chép, nên tài liệu ghép từ nhiều
+    phần mất liên kết giữa các phần. Trang thứ i của `doc` ứng với trang source_pages[i] của file
+    gốc; mọi liên kết nội bộ của file gốc được đặt lại với số trang đích mới, liên kết tới trang
+    không có trong `doc` bị bỏ.
+    """
+    position = {page_num: i for i, page_num in enumerate(source_pages)}
+    internal = (fitz.LINK_GOTO, fitz.LINK_NAMED)
+    for page, page_num in zip(doc, source_pages):
+        for link in page.get_links():
+            if link["kind"] in internal: page.delete_link(link)
+        for link in source[page_num].get_links():
+            target = position.get(link.get("page", -1))
+            if link["kind"] not in internal or target is None: continue
+            page.insert_link({"kind": fitz.LINK_GOTO, "from": link["from"], "page": target,
+                              "to": link.get("to") or fitz.Point(0, 0), "zoom": link.get("zoom", 0)})
+
+
+def copy_document_extras(doc, source, source_pages):
+    """Chép nhãn trang, file đính kèm và đích có tên của file gốc (insert_pdf không chép những thứ này)."""
+    if source.get_page_labels():
+        if source_pages == list(range(len(source))):
+            doc.set_page_labels(source.get_page_labels())
+        else:
+            # Chỉ còn một phần các trang: giữ nguyên nhãn của từng trang dưới dạng tiền tố cố định
+            doc.set_page_labels([{"startpage": i, "prefix": source[page_num].get_label(), "style": "", "firstpagenum": 1}
+                                 for i, page_num in enumerate(source_pages)])
+    existing = set(doc.embfile_names())
+    for name in source.embfile_names():
+        if name in existing: continue
+        info = source.embfile_info(name)
+        doc.embfile_add(name, source.embfile_get(name), filename=info["filename"], ufilename=info["ufilename"], desc=info["description"])
+    position = {page_num: i for i, page_num in enumerate(source_pages)}
+    destinations = []
+    for name, dest in source.resolve_names().items():
+        target = position.get(dest.get("page", -1))
+        if target is None: continue
+        to = dest.get("to")
+        view = f"/XYZ {to[0]:g} {to[1]:g} {dest.get('zoom') or 0:g}" if to else "/Fit"
+        destinations.append((name.encode("utf-8"), f"[{doc[target].xref} 0 R {view}]"))
+    if destinations and not doc.resolve_names():
+        xref = doc.get_new_xref()
+        doc.update_object(xref, "<</Names [" + " ".join(f"<{key.hex()}> {value}" for key, value in sorted(destinations)) + "]>>")
+        doc.xref_set_key(doc.pdf_catalog(), "Names/Dests", f"{xref} 0 R")
+
+
+def restore_from_origin(doc, source_path, source_pages):
+    with fitz.open(source_path) as source:
+        restore_internal_links(doc, source, source_pages)
+        copy_document_extras(doc, source, source_pages)
+
+
+def merge_pdf_files(paths, output_path, toc=None, metadata=None, origin=None, **save_options):
+    """
+    Ghép các file PDF (theo thứ tự) thành file đích. Trả về True nếu có ít nhất một trang.
+    Chỉ có một file thì lưu lại chính file đó, giữ mọi thứ ở cấp tài liệu.
+    `origin` = (file gốc, số trang gốc của từng trang đích) để đặt lại liên kết giữa các phần,
+    nhãn trang, file đính kèm và đích có tên.
+    """
+    out = fitz.open(paths[0]) if len(paths) == 1 else fitz.open()
+    try:
+        if len(paths) > 1:
+            for path in paths:
+                with fitz.open(path) as part: out.insert_pdf(part)
+        if len(out) == 0: return False
+        if origin: restore_from_origin(out, *origin)
+        if toc: out.set_toc(toc)
+        if metadata: out.set_metadata(metadata)
+        tmp_path = output_path + ".tmp"
+        out.save(tmp_path, **(save_options or {"garbage": 3, "deflate": True}))
+    finally:
+        out.close()
+    os.replace(tmp_path, output_path)
+    return True
+
+
+def merge_pdf_pages(sources, output_path, toc=None, metadata=None, origin=None, **save_options):
+    """
+    Ghép từng trang theo thứ tự từ nhiều file: `sources` là danh sách (đường dẫn, số trang trong file đó).
+    Các trang liên tiếp của cùng một file được chép một lần. Trả về True nếu có ít nhất một trang.
+    `origin` như ở merge_pdf_files.
+    """
+    runs = []  # [đường dẫn, trang đầu, trang cuối]
+    for path, index in sources:
+        if runs and runs[-1][0] == path and runs[-1][2] == index - 1: runs[-1][2] = index
+        else: runs.append([path, index, index])
+    out, opened = fitz.open(), {}
+    try:
+        for path, first, last in runs:
+            if path not in opened: opened[path] = fitz.open(path)
+            out.insert_pdf(opened[path], from_page=first, to_page=last)
+        if len(out) == 0: return False
+        if origin: restore_from_origin(out, *origin)
+        if toc: out.set_toc(toc)
+        if metadata: out.set_metadata(metadata)
+        tmp_path = output_path + ".tmp"
+        out.save(tmp_path, **(save_options or {"garbage": 3, "deflate": True}))
+    finally:
+        for part in opened.values(): part.close()
+        out.close()
+    os.replace(tmp_path, output_path)
+    return True
+
+
+class StreamingPdfWriter:
+    def __init__(self, output_path, dpi, window=1):
+        self.output_path = output_path
+        self.dpi = dpi
+        self.window = max(1, window)
+        self.doc = fitz.open()
+        self.next_page = 0
+        self.pending = {}  # bộ đệm sắp xếp: số trang -> ảnh (None = trang bị bỏ qua)
+        self.pages_written = 0
+
+    def add(self, page_num, img):
+        """Nhận một trang đã xong (có thể lệch thứ tự) và ghi mọi trang liền mạch đang chờ."""
+        if page_num < self.next_page or page_num in self.pending:
+            raise ValueError(f"Trang {page_num + 1} đã được ghi trước đó.")
+        self.pending[page_num] = img
+        if len(self.pending) > self.window:
+            raise RuntimeError(f"Bộ đệm sắp xếp vượt quá {self.window} trang.")
+        while self.next_page in self.pending:
+            ready = self.pending.pop(self.next_page)
+            if ready is not None: self._append_image(ready)
+            self.next_page += 1
+
+    def skip(self, page_num):
+        """Đánh dấu một trang lỗi để các trang sau không phải chờ nó."""
+        self.add(page_num, None)
+
+    def _append_image(self, img):
+        _insert_image_page(self.doc, img, self.dpi)
+        self.pages_written += 1
+
+    def close(self):
+        """Lưu file PDF. Trả về True nếu có ít nhất một trang được ghi."""
+        try:
+            if self.pages_written == 0: return False
+            self.doc.save(self.output_path, garbage=3, deflate=True)
+            return True
+        finally:
+            self.doc.close()
+            self.pending.clear()
+
+    def abort(self):
+        """Bỏ tài liệu đang ghi dở (dùng khi có lỗi)."""
+        self.pending.clear()
+        if not self.doc.is_closed: self.doc.close()
@@ -0,0 +1,61 @@
+import re
+import json
+from collections import Counter
+
+# =====================================================================================
+# LỌC CỤM TỪ KHÔNG CẦN DỊCH TRƯỚC KHI GỬI ĐI DỊCH
+# Số trang, gạch đầu dòng, dấu câu đứng riêng, ô bảng chỉ có số, URL, email, tên hàm/biến
+# trong tài liệu kỹ thuật và nhiễu OCR như "|" hay "—" chiếm phần lớn số span nhưng dịch
+# cũng không đổi gì. Những cụm từ này được giữ nguyên văn: không tra bộ nhớ dịch, không gọi
+# engine, không lưu vào bộ nhớ dịch. Người dùng thêm được biểu thức chính quy riêng và danh
+# sách thuật ngữ (tên sản phẩm, mã lệnh...) luôn giữ nguyên.
+# =====================================================================================
+
+# Tên quy tắc -> biểu thức; cụm từ khớp toàn bộ (fullmatch) với một quy tắc thì không dịch
+DEFAULT_RULES = {
+    # Không có chữ cái nào: số trang, số liệu trong bảng, dấu câu, ký hiệu, nhiễu OCR
+    "no_letters": r"[\W\d_]+",
+    "url": r"(?:https?://|ftp://|www\.)\S+",
+    "email": r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",
+    # snake_case, camelCase, module.ham(), đường dẫn tuyệt đối
+    "identifier": r"[A-Za-z_]\w*_\w*(?:\(\))?|[a-z]+[A-Z]\w*(?:\(\))?|[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)+(?:\(\))?|[A-Za-z_]\w*\(\)|(?:/|~/|[A-Za-z]:\\)\S+",
+    "version": r"[vV]\d+(?:\.\d+)*",
+}
+
+
+class SegmentFilter:
+    def __init__(self, patterns=(), terms=(), use_defaults=True):
+        rules = dict(DEFAULT_RULES) if use_defaults else {}
+        for i, pattern in enumerate(patterns): rules[f"custom_{i + 1}"] = pattern
+        self.rules = [(name, re.compile(pattern)) for name, pattern in rules.items()]
+        self.terms = frozenset(term.strip() for term in terms if term.strip())
+
+    def match(self, text):
+        """Trả về tên quy tắc khiến cụm từ được giữ nguyên, hoặc None nếu cần dịch."""
+        if text in self.terms: return "glossary"
+        for name, rule in self.rules:
+            if rule.fullmatch(text): return name
+        return None
+
+    def split(self, texts):
+        """Chia danh sách cụm từ thành (cần dịch, Counter số cụm từ giữ nguyên theo từng quy tắc)."""
+        to_translate, skipped = [], Counter()
+        for text in texts:
+            name = self.match(text)
+            if name is None: to_translate.append(text)
+            else: skipped[name] += 1
+        return to_translate, skipped
+
+
+def load_filter(rules_file=None, patterns=(), terms=(), use_defaults=True):
+    """
+    Tạo bộ lọc từ cấu hình, cộng thêm quy tắc trong file JSON (nếu có):
+      {"patterns": ["REQ-\\\\d+", ...], "terms": ["PyMuPDF", ...], "defaults": true}
+    """
+    patterns, terms = list(patterns), list(terms)
+    if rules_file:
+        with open(rules_file, encoding='utf-8') as f: config = json.load(f)
+        patterns += config.get("patterns", [])
+        terms += config.get("terms", [])
+        use_defaults = config.get("defaults", use_defaults)
+    return SegmentFilter(patterns, terms, use_defaults)
@@ -0,0 +1,75 @@
+import os
+from functools import lru_cache
+
+import fitz  # PyMuPDF
+
+from ve_chu import fit_text, FALLBACK_FONT_SIZE
+
+# =====================================================================================
+# LỚP PHỦ VECTOR CHO CHẾ ĐỘ TRỰC QUAN (OCR)
+# Thay vì vẽ bản dịch lên ảnh trang rồi nén lại cả trang, giữ nguyên trang gốc và chỉ thêm
+# hình chữ nhật trắng che chữ cũ cùng bản dịch dạng chữ vector tại đúng tọa độ hộp OCR.
+# Tọa độ điểm ảnh được đổi sang tọa độ PDF theo DPI lúc OCR (72 / DPI). Cỡ chữ được chọn
+# bằng cùng hàm fit_text như khi vẽ lên ảnh, nên bố cục hai kiểu xuất giống nhau.
+# =====================================================================================
+
+FONT_DIRS = [os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+             "/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"),
+             "/Library/Fonts", "/System/Library/Fonts"]
+PDF_FALLBACK_FONT = "helv"  # font có sẵn của PDF, chỉ đủ cho chữ Latin
+
+
+@lru_cache(maxsize=None)
+def resolve_font_file(font_path):
+    """Tìm file TrueType theo đường dẫn hoặc theo tên trong các thư mục font hệ thống; None nếu không thấy."""
+    if font_path and os.path.isfile(font_path): return os.path.abspath(font_path)
+    name = os.path.basename(font_path or "").lower()
+    if not name: return None
+    for folder in FONT_DIRS:
+        for root, _, files in os.walk(folder):
+            for file_name in files:
+                if file_name.lower() == name: return os.path.join(root, file_name)
+    return None
+
+
+@lru_cache(maxsize=None)
+def get_pdf_font(font_file):
+    return fitz.Font(fontfile=font_file) if font_file else fitz.Font(PDF_FALLBACK_FONT)
+
+
+def overlay_page(page, boxes, translations, dpi, font_path):
+    """
+    Phủ bản dịch lên một trang PDF. `boxes` là các hộp OCR (x, y, w, h, chữ gốc) tính theo
+    điểm ảnh của ảnh trang ở `dpi`. Trả về số hộp có bản dịch.
+    """
+    if not boxes: return 0
+    font_file = resolve_font_file(font_path)
+    measure_path = font_file or font_path
+    ascender = get_pdf_font(font_file).ascender
+    font_options = {"fontname": "F-overlay", "fontfile": font_file} if font_file else {"fontname": PDF_FALLBACK_FONT}
+    scale = 72.0 / dpi
+    # Ảnh OCR được dựng theo hướng hiển thị; đưa tọa độ về hệ tọa độ chưa xoay của trang
+    to_page = page.derotation_matrix
+    shape = page.new_shape()
+    lines_to_write, hits = [], 0
+    for x, y, w, h, original_text in boxes:
+        translated_text = translations.get(original_text)
+        if translated_text is None: translated_text = original_text
+        else: hits += 1
+        shape.draw_rect(fitz.Rect(x, y, x + w, y + h) * scale * to_page)
+        layout = fit_text(translated_text, measure_path, w, h)
+        if layout is None:
+            if not translated_text.strip(): continue
+            size, lines, line_height = FALLBACK_FONT_SIZE, (translated_text[:20] + "...",), 0
+        else:
+            size, lines, line_height = layout
+        font_size = size * scale
+        for i, line in enumerate(lines):
+            baseline = fitz.Point(x, y + i * line_height) * scale + (0, ascender * font_size)
+            lines_to_write.append((baseline * to_page, line, font_size))
+    shape.finish(color=(1, 1, 1), fill=(1, 1, 1), width=0)
+    # Mọi hình và chữ của trang nằm trong một luồng nội dung duy nhất
+    for baseline, line, font_size in lines_to_write:
+        shape.insert_text(baseline, line, fontsize=font_size, color=(0, 0, 0), rotate=page.rotation, **font_options)
+    shape.commit(overlay=True)
+    return hits
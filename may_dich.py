@@ -0,0 +1,176 @@
+import os
+import re
+import time
+import json
+import urllib.request
+
+# =====================================================================================
+# CÁC ENGINE DỊCH (BACKEND) CÓ THỂ THAY THẾ
+# Mọi engine cùng một giao diện: translate_batch(texts) cùng hai giới hạn max_batch_size
+# và max_chars cho mỗi yêu cầu. Engine được chọn theo tên qua create_backend().
+#   google : Google Translate qua deep_translator (mặc định)
+#   http   : máy chủ dịch tự triển khai, API kiểu LibreTranslate
+#   stub   : engine giả chạy offline, dùng để đo hiệu năng và thử nghiệm không cần mạng
+# Engine chỉ dịch được từng chuỗi một (mỗi chuỗi một yêu cầu HTTP, như deep_translator) khai báo
+# packs_requests = True: bộ điều phối gộp nhiều cụm từ vào một chuỗi có đánh số (pack_texts) và
+# gửi qua translate_text(), nên mỗi yêu cầu thật đều đi qua bộ giới hạn tốc độ.
+# =====================================================================================
+
+class TranslationBackend:
+    name = None
+    max_batch_size = 100   # số cụm từ tối đa trong một yêu cầu
+    max_chars = 5000       # số ký tự tối đa trong một yêu cầu
+    packs_requests = False # True: mỗi chuỗi là một yêu cầu, nên gộp nhiều cụm từ vào một chuỗi
+
+    def __init__(self, source='auto', target='vi', **options):
+        self.source = source
+        self.target = target
+        self.options = options
+
+    def translate_batch(self, texts):
+        """Dịch một danh sách cụm từ, trả về danh sách bản dịch cùng độ dài."""
+        raise NotImplementedError
+
+    def translate_text(self, text):
+        """Dịch một chuỗi trong một yêu cầu (dùng cho các gói đã gộp)."""
+        return self.translate_batch([text])[0]
+
+
+_BACKENDS = {}
+
+def register_backend(cls):
+    _BACKENDS[cls.name] = cls
+    return cls
+
+def available_backends():
+    return sorted(_BACKENDS)
+
+def get_backend_class(name):
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Không có engine dịch '{name}'. Các engine hiện có: {', '.join(available_backends())}")
+
+def create_backend(name, source='auto', target='vi', **options):
+    return get_backend_class(name)(source=source, target=target, **options)
+
+# --- GỘP NHIỀU CỤM TỪ VÀO MỘT YÊU CẦU ---
+# Mỗi cụm từ nằm trên một dòng riêng, mở đầu bằng mốc "[[số thứ tự]]". Chữ số và ngoặc vuông
+# đi qua máy dịch nguyên vẹn; khi tách lại, mốc được nhận cả khi máy dịch chèn thêm khoảng trắng.
+# Nếu số mốc hoặc thứ tự mốc không khớp, bộ điều phối chia đôi gói và gửi lại cho tới từng cụm từ lẻ.
+PACK_SEPARATOR = "\n"
+_PACK_MARKER = re.compile(r"\[\s*\[\s*(\d+)\s*\]\s*\]")
+
+def pack_texts(texts):
+    return PACK_SEPARATOR.join(f"[[{i}]] {text}" for i, text in enumerate(texts))
+
+def unpack_text(packed, count):
+    """Tách chuỗi đã dịch thành `count` bản dịch; None nếu các mốc không còn khớp."""
+    parts = _PACK_MARKER.split(packed or "")
+    if parts[0].strip() or len(parts) != 2 * count + 1: return None
+    if parts[1::2] != [str(i) for i in range(count)]: return None
+    return [part.strip() for part in parts[2::2]]
+
+
+class PackMismatch(ValueError):
+    """Các mốc [[n]] trong bản dịch của một gói không còn khớp; gói cần được chia nhỏ."""
+
+
+def packs_requests(name, options):
+    """Engine có cần gộp cụm từ không; tùy chọn pack=0 để gửi từng chuỗi."""
+    return get_backend_class(name).packs_requests and str(options.get("pack", True)).lower() not in ("0", "false", "no", "off")
+
+def split_batches(texts, max_batch_size, max_chars, packed=False):
+    """
+    Chia danh sách cụm từ thành các gói không vượt quá số cụm từ và số ký tự cho phép.
+    `packed`: số ký tự tính theo chuỗi sau khi gộp (kể cả mốc và dấu xuống dòng), cụm từ tự chứa
+    mốc [[n]] được đặt riêng một gói vì không gộp được.
+    """
+    def size(index, text):
+        return len(text) + (len(f"[[{index}]] ") + len(PACK_SEPARATOR) if packed else 0)
+
+    batches, current, current_chars = [], [], 0
+    for text in texts:
+        alone = packed and _PACK_MARKER.search(text)
+        if current and (alone or len(current) >= max_batch_size or current_chars + size(len(current), text) > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(text)
+        current_chars += size(len(current) - 1, text)
+        if alone:
+            batches.append(current)
+            current, current_chars = [], 0
+    if current: batches.append(current)
+    return batches
+
+
+@register_backend
+class GoogleBackend(TranslationBackend):
+    """
+    translate_batch của deep_translator gửi mỗi chuỗi một yêu cầu, nên mặc định bộ điều phối gộp
+    các cụm từ lại (packs_requests). Tùy chọn pack=0 để quay về gửi từng chuỗi.
+    """
+    name = "google"
+    packs_requests = True
+
+    def __init__(self, source='auto', target='vi', **options):
+        super().__init__(source, target, **options)
+        from deep_translator import GoogleTranslator
+        self._translator = GoogleTranslator(source=source, target=target)
+
+    def translate_batch(self, texts):
+        return self._translator.translate_batch(list(texts))
+
+    def translate_text(self, text):
+        return self._translator.translate(text)
+
+
+@register_backend
+class HttpBackend(TranslationBackend):
+    """Máy chủ dịch nội bộ. Địa chỉ lấy từ tùy chọn `url` hoặc biến môi trường MT_SERVER_URL."""
+    name = "http"
+    max_batch_size = 200
+    max_chars = 20000
+
+    def __init__(self, source='auto', target='vi', **options):
+        super().__init__(source, target, **options)
+        self.url = options.get("url") or os.environ.get("MT_SERVER_URL", "http://localhost:5000/translate")
+        self.api_key = options.get("api_key") or os.environ.get("MT_SERVER_API_KEY")
+        self.timeout = options.get("timeout", 60)
+
+    def translate_batch(self, texts):
+        payload = {"q": list(texts), "source": self.source, "target": self.target, "format": "text"}
+        if self.api_key: payload["api_key"] = self.api_key
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf-8'), headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            translated = json.loads(response.read().decode('utf-8'))["translatedText"]
+        return translated if isinstance(translated, list) else [translated]
+
+
+@register_backend
+class StubBackend(TranslationBackend):
+    """
+    Engine giả, tất định, không cần mạng. Tùy chọn:
+      style            : "reverse" (đảo chuỗi), "pad" (thêm tiền tố/hậu tố) hoặc "upper"
+      latency          : số giây chờ cho mỗi yêu cầu, mô phỏng độ trễ mạng
+      latency_per_char : số giây chờ thêm cho mỗi ký tự
+    """
+    name = "stub"
+    max_batch_size = 100
+    max_chars = 5000
+
+    def __init__(self, source='auto', target='vi', **options):
+        super().__init__(source, target, **options)
+        self.style = options.get("style", "pad")
+        self.latency = float(options.get("latency", 0.0))
+        self.latency_per_char = float(options.get("latency_per_char", 0.0))
+
+    def _fake(self, text):
+        if self.style == "reverse": return text[::-1]
+        if self.style == "upper": return text.upper()
+        return f"[{self.target}] {text} ~"
+
+    def translate_batch(self, texts):
+        delay = self.latency + self.latency_per_char * sum(len(t) for t in texts)
+        if delay: time.sleep(delay)
+        return [self._fake(t) for t in texts]
@@ -0,0 +1,250 @@
+import os
+
+import pytesseract
+from PIL import Image
+
+# =====================================================================================
+# NHẬN DẠNG VĂN BẢN (OCR) CHO CHẾ ĐỘ TRỰC QUAN
+# Kết quả OCR được thu gọn thành các bản ghi (x, y, w, h, text) để gửi qua lại giữa
+# các tiến trình với chi phí nhỏ nhất.
+# Engine OCR có thể thay thế, cùng một giao diện image_to_data(pixels) trả về bảng từ
+# giống pytesseract.Output.DICT:
+#   tesserocr   : gọi thẳng thư viện Tesseract, mô hình ngôn ngữ nạp một lần và giữ suốt
+#                 đời tiến trình; bộ đệm điểm ảnh đưa thẳng vào, không file tạm, không nén ảnh
+#   pytesseract : chạy lệnh tesseract cho mỗi trang (ghi ảnh ra file tạm), dùng khi không có tesserocr
+#   auto        : tesserocr nếu dùng được, nếu không thì pytesseract
+# =====================================================================================
+
+OCR_LANG = 'eng+vie'
+MIN_CONFIDENCE = 60
+# Đơn vị gửi đi dịch: "word" (từng từ), "line" (từng dòng) hoặc "paragraph" (cả đoạn).
+# Dịch theo đoạn giảm số yêu cầu khoảng 10 lần và cho bản dịch có ngữ cảnh câu.
+OCR_SEGMENT_LEVEL = "paragraph"
+OCR_ENGINE = "auto"
+TESSDATA_PATH = None  # thư mục tessdata cho tesserocr; None = TESSDATA_PREFIX hoặc cạnh tesseract_cmd
+_GROUP_KEYS = {"word": ("block_num", "par_num", "line_num", "word_num"),
+               "line": ("block_num", "par_num", "line_num"),
+               "paragraph": ("block_num", "par_num")}
+
+
+def group_words(ocr_data, level=OCR_SEGMENT_LEVEL, min_confidence=MIN_CONFIDENCE):
+    """
+    Gom các từ trong kết quả image_to_data thành dòng hoặc đoạn theo cột block_num/par_num/line_num
+    của Tesseract. Mỗi nhóm thành một bản ghi (x, y, w, h, text) với khung bao gộp của các từ.
+    Nhóm được giữ lại nếu độ tin cậy trung bình của các từ vượt ngưỡng.
+    """
+    keys = _GROUP_KEYS[level]
+    groups = {}  # dict giữ thứ tự đọc của Tesseract
+    for i in range(len(ocr_data['level'])):
+        text = ocr_data['text'][i].strip()
+        conf = int(float(ocr_data['conf'][i]))
+        if not text or conf < 0: continue  # dòng cấu trúc (trang/khối/đoạn) có conf = -1
+        key = tuple(ocr_data[k][i] for k in keys)
+        group = groups.setdefault(key, {"words": [], "confs": [], "box": None, "line": None, "lines": []})
+        line_key = (ocr_data['block_num'][i], ocr_data['par_num'][i], ocr_data['line_num'][i])
+        if line_key != group["line"]:
+            group["line"] = line_key
+            group["lines"].append([])
+        group["lines"][-1].append(text)
+        group["confs"].append(conf)
+        x, y, w, h = ocr_data['left'][i], ocr_data['top'][i], ocr_data['width'][i], ocr_data['height'][i]
+        if group["box"] is None: group["box"] = [x, y, x + w, y + h]
+        else:
+            box = group["box"]
+            box[0], box[1], box[2], box[3] = min(box[0], x), min(box[1], y), max(box[2], x + w), max(box[3], y + h)
+    segments = []
+    for group in groups.values():
+        if sum(group["confs"]) / len(group["confs"]) <= min_confidence: continue
+        # Từ bị gạch nối cuối dòng được nối lại trước khi dịch
+        text = ""
+        for line in group["lines"]:
+            line_text = " ".join(line)
+            if text.endswith("-") and len(text) > 1 and text[-2].isalpha(): text = text[:-1] + line_text
+            else: text = f"{text} {line_text}" if text else line_text
+        x0, y0, x1, y1 = group["box"]
+        segments.append((x0, y0, x1 - x0, y1 - y0, text))
+    return segments
+
+
+class PixelBuffer:
+    """Bộ đệm điểm ảnh thô (vd: pix.samples của PyMuPDF) cùng kích thước, không sao chép dữ liệu."""
+    __slots__ = ("samples", "width", "height", "channels", "stride")
+
+    def __init__(self, samples, width, height, channels=3, stride=None):
+        self.samples = samples
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.stride = stride or width * channels
+
+    @classmethod
+    def from_image(cls, img):
+        if img.mode not in ("RGB", "L"): img = img.convert("RGB")
+        return cls(img.tobytes(), img.width, img.height, len(img.getbands()))
+
+    def to_image(self):
+        mode = {1: "L", 3: "RGB", 4: "RGBA"}[self.channels]
+        return Image.frombuffer(mode, (self.width, self.height), self.samples, "raw", mode, self.stride, 1)
+
+
+class OcrEngine:
+    name = None
+
+    def __init__(self, lang=OCR_LANG):
+        self.lang = lang
+
+    def image_to_data(self, pixels):
+        """Nhận dạng một PixelBuffer, trả về dict các cột level/block_num/.../conf/text như pytesseract."""
+        raise NotImplementedError
+
+    def version(self):
+        """Phiên bản Tesseract, là một phần khóa của bộ nhớ đệm OCR."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+_OCR_ENGINES = {}
+
+def register_ocr_engine(cls):
+    _OCR_ENGINES[cls.name] = cls
+    return cls
+
+def available_ocr_engines():
+    return ["auto"] + sorted(_OCR_ENGINES)
+
+
+@register_ocr_engine
+class PytesseractEngine(OcrEngine):
+    name = "pytesseract"
+
+    def image_to_data(self, pixels):
+        try:
+            return pytesseract.image_to_data(pixels.to_image(), output_type=pytesseract.Output.DICT, lang=self.lang)
+        except pytesseract.TesseractNotFoundError:
+            # Lỗi gốc của pytesseract không pickle được, làm treo Pool khi gửi về tiến trình cha
+            raise RuntimeError(f"Không tìm thấy Tesseract tại '{pytesseract.pytesseract.tesseract_cmd}'. Vui lòng kiểm tra lại đường dẫn.")
+
+    def version(self):
+        try:
+            return str(pytesseract.get_tesseract_version())
+        except pytesseract.TesseractNotFoundError:
+            raise RuntimeError(f"Không tìm thấy Tesseract tại '{pytesseract.pytesseract.tesseract_cmd}'. Vui lòng kiểm tra lại đường dẫn.")
+
+
+_TSV_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num", "left", "top", "width", "height", "conf", "text")
+
+def parse_tsv(tsv):
+    """Đọc kết quả TSV của Tesseract (không có dòng tiêu đề) thành dict cột như pytesseract."""
+    data = {column: [] for column in _TSV_COLUMNS}
+    for row in tsv.splitlines():
+        fields = row.split("\t", len(_TSV_COLUMNS) - 1)
+        if len(fields) < len(_TSV_COLUMNS) - 1: continue
+        if len(fields) < len(_TSV_COLUMNS): fields.append("")
+        for column, value in zip(_TSV_COLUMNS[:10], fields): data[column].append(int(value))
+        data["conf"].append(float(fields[10]))
+        data["text"].append(fields[11])
+    return data
+
+
+def default_tessdata_path():
+    if TESSDATA_PATH: return TESSDATA_PATH
+    if os.environ.get("TESSDATA_PREFIX"): return os.environ["TESSDATA_PREFIX"]
+    # Bộ cài Windows đặt tessdata cạnh tesseract.exe
+    folder = os.path.join(os.path.dirname(pytesseract.pytesseract.tesseract_cmd or ""), "tessdata")
+    return folder if os.path.isdir(folder) else None
+
+
+@register_ocr_engine
+class TesserocrEngine(OcrEngine):
+    name = "tesserocr"
+
+    def __init__(self, lang=OCR_LANG):
+        super().__init__(lang)
+        import tesserocr
+        path = default_tessdata_path()
+        self._api = tesserocr.PyTessBaseAPI(lang=lang, **({"path": path} if path else {}))
+
+    def image_to_data(self, pixels):
+        api = self._api
+        api.SetImageBytes(bytes(pixels.samples), pixels.width, pixels.height, pixels.channels, pixels.stride)
+        api.Recognize()
+        return parse_tsv(api.GetTSVText(0))
+
+    def version(self):
+        return self._api.Version()
+
+    def close(self):
+        self._api.End()
+
+
+def binarize(pixels, threshold):
+    """Nhị phân hóa ảnh xám: điểm sáng hơn ngưỡng thành trắng, còn lại thành đen."""
+    img = pixels.to_image()
+    if img.mode != "L": img = img.convert("L")
+    img = img.point([255 if value > threshold else 0 for value in range(256)])
+    return PixelBuffer(img.tobytes(), img.width, img.height, 1)
+
+
+def scale_boxes(boxes, factor):
+    """Đổi tọa độ hộp chữ từ ảnh OCR sang ảnh đầu ra khi hai ảnh khác DPI."""
+    if factor == 1: return boxes
+    return [(round(x * factor), round(y * factor), round(w * factor), round(h * factor), text) for x, y, w, h, text in boxes]
+
+
+# Mỗi tiến trình giữ engine đã nạp theo (tên, ngôn ngữ) tới khi kết thúc
+_engines = {}
+
+def get_ocr_engine(name=None, lang=OCR_LANG):
+    name = name or OCR_ENGINE
+    key = (name, lang)
+    engine = _engines.get(key)
+    if engine is None:
+        if name == "auto":
+            try:
+                engine = TesserocrEngine(lang)
+            except (ImportError, RuntimeError):  # chưa cài tesserocr hoặc không nạp được dữ liệu ngôn ngữ
+                engine = PytesseractEngine(lang)
+        elif name in _OCR_ENGINES:
+            engine = _OCR_ENGINES[name](lang)
+        else:
+            raise ValueError(f"Không có engine OCR '{name}'. Các engine hiện có: {', '.join(available_ocr_engines())}")
+        _engines[key] = engine
+    return engine
+
+
+_WORD_COLUMNS = ("block_num", "par_num", "line_num", "word_num", "left", "top", "width", "height", "conf", "text")
+
+def compact_words(ocr_data):
+    """Chỉ giữ các dòng là từ (có chữ, conf >= 0) và các cột group_words cần; đủ gọn để lưu đệm."""
+    keep = [i for i in range(len(ocr_data["text"])) if ocr_data["text"][i].strip() and float(ocr_data["conf"][i]) >= 0]
+    words = {column: [ocr_data[column][i] for i in keep] for column in _WORD_COLUMNS}
+    words["level"] = [5] * len(keep)
+    return words
+
+
+def ocr_words(pixels, lang=OCR_LANG, engine=None):
+    """Chạy OCR trên một PixelBuffer, trả về bảng từ gọn (xem compact_words)."""
+    return compact_words(get_ocr_engine(engine, lang).image_to_data(pixels))
+
+
+_engine_ids = {}
+
+def ocr_engine_id(lang=OCR_LANG, engine=None):
+    """Tên và phiên bản của engine OCR thực sự được dùng (sau khi "auto" đã chọn)."""
+    key = (engine or OCR_ENGINE, lang)
+    if key not in _engine_ids:
+        ocr_engine = get_ocr_engine(engine, lang)
+        _engine_ids[key] = f"{ocr_engine.name}-{ocr_engine.version()}"
+    return _engine_ids[key]
+
+
+def ocr_pixels(pixels, lang=OCR_LANG, min_confidence=MIN_CONFIDENCE, level=OCR_SEGMENT_LEVEL, engine=None):
+    """Chạy OCR trên một PixelBuffer, trả về danh sách (x, y, w, h, text) theo đơn vị `level`."""
+    return group_words(ocr_words(pixels, lang, engine), level, min_confidence)
+
+
+def ocr_boxes(img, lang=OCR_LANG, min_confidence=MIN_CONFIDENCE, level=OCR_SEGMENT_LEVEL, engine=None):
+    """Chạy OCR trên ảnh PIL, trả về danh sách (x, y, w, h, text) theo đơn vị `level`."""
+    return ocr_pixels(PixelBuffer.from_image(img), lang, min_confidence, level, engine)
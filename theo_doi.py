@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import datetime
+from contextlib import contextmanager
+
+# =====================================================================================
+# ĐO THỜI GIAN THEO TỪNG (TRANG, GIAI ĐOẠN)
+# Mỗi giai đoạn (rasterize, ocr, translate, render, encode, save...) được ghi thành một
+# "span" gồm thời gian thực, thời gian CPU và các bộ đếm (số hộp chữ, cache hit/miss,
+# số byte tạo ra). Span trong worker của Pool được gom vào bộ đệm của tiến trình đó rồi
+# gửi về tiến trình cha cùng kết quả trang, nên không cần IPC riêng.
+# =====================================================================================
+
+_process_spans = []  # span chưa gửi đi của tiến trình hiện tại
+
+
+@contextmanager
+def trace_span(stage, page=None, **counts):
+    """
+    Đo một giai đoạn. Có thể cập nhật bộ đếm qua dict trả về:
+        with trace_span("ocr", page=3) as span: span["boxes"] = len(boxes)
+    """
+    record = {"stage": stage, "page": page, "pid": os.getpid(), "start": time.time()}
+    record.update(counts)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall"] = time.perf_counter() - wall_start
+        record["cpu"] = time.process_time() - cpu_start
+        _process_spans.append(record)
+
+
+def drain_spans():
+    """Lấy ra (và xóa) các span của tiến trình hiện tại, để gửi về tiến trình cha."""
+    spans = list(_process_spans)
+    _process_spans.clear()
+    return spans
+
+
+class Tracer:
+    """Gom span của tiến trình cha và các worker, tính tốc độ từng giai đoạn và ghi file trace."""
+
+    def __init__(self):
+        self.spans = []
+        drain_spans()  # bỏ span còn sót từ lần chạy trước trong cùng tiến trình
+
+    def collect(self, spans=None):
+        self.spans.extend(drain_spans() if spans is None else spans)
+
+    def stage_summary(self):
+        self.collect()
+        summary = {}
+        for span in self.spans:
+            stage = summary.setdefault(span["stage"], {"count": 0, "wall": 0.0, "cpu": 0.0})
+            stage["count"] += 1
+            stage["wall"] += span["wall"]
+            stage["cpu"] += span["cpu"]
+        return summary
+
+    def write(self, path, fmt="jsonl"):
+        self.collect()
+        if fmt == "chrome":
+            # Định dạng Trace Event, mở bằng chrome://tracing hoặc Perfetto
+            events = []
+            for span in self.spans:
+                args = {k: v for k, v in span.items() if k not in ("stage", "pid", "start", "wall")}
+                events.append({"name": span["stage"], "cat": "page", "ph": "X", "pid": span["pid"], "tid": span["pid"],
+                               "ts": int(span["start"] * 1e6), "dur": int(span["wall"] * 1e6), "args": args})
+            with open(path, 'w', encoding='utf-8') as f: json.dump({"traceEvents": events}, f)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                for span in self.spans: f.write(json.dumps(span, ensure_ascii=False) + "\n")
+        return path
+
+
+def merge_trace_files(paths, path, fmt="jsonl"):
+    """Ghép các file trace (cùng định dạng) thành một file, ví dụ trace các phần của chế độ tự động."""
+    if fmt == "chrome":
+        events = []
+        for part in paths:
+            with open(part, encoding='utf-8') as f: events.extend(json.load(f)["traceEvents"])
+        with open(path, 'w', encoding='utf-8') as f: json.dump({"traceEvents": events}, f)
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            for part in paths:
+                with open(part, encoding='utf-8') as src: f.write(src.read())
+    return path
+
+
+class EtaEstimator:
+    """
+    Ước tính thời gian còn lại từ tốc độ riêng của từng giai đoạn theo trang,
+    thay vì lấy trung bình tổng thời gian trên mỗi trang.
+    """
+
+    def __init__(self, tracer, total_pages, stages, parallelism=1, already_done=None):
+        self.tracer = tracer
+        self.total_pages = total_pages
+        self.stages = list(stages)
+        self.parallelism = max(1, parallelism)
+        self.already_done = already_done or {}  # giai đoạn -> số trang đã xong từ lần chạy trước
+
+    def mark_done(self, stages, pages=1):
+        """Ghi nhận trang không cần chạy các giai đoạn này (vd lấy từ bộ nhớ đệm, trang trắng)."""
+        for stage in stages:
+            self.already_done[stage] = self.already_done.get(stage, 0) + pages
+
+    def remaining_seconds(self):
+        self.tracer.collect()
+        done, wall = {}, {}
+        for span in self.tracer.spans:
+            if span["page"] is None or span["stage"] not in self.stages: continue
+            done[span["stage"]] = done.get(span["stage"], 0) + 1
+            wall[span["stage"]] = wall.get(span["stage"], 0.0) + span["wall"]
+        if not done: return None
+        # Giai đoạn chưa chạy trang nào thì tạm lấy tốc độ trung bình của các giai đoạn đã có
+        known_rates = [wall[s] / done[s] for s in done]
+        fallback_rate = sum(known_rates) / len(known_rates)
+        remaining = 0.0
+        for stage in self.stages:
+            rate = wall[stage] / done[stage] if stage in done else fallback_rate
+            remaining += max(0, self.total_pages - done.get(stage, 0) - self.already_done.get(stage, 0)) * rate
+        return remaining / self.parallelism
+
+    def format(self):
+        remaining = self.remaining_seconds()
+        return "Đang tính toán..." if remaining is None else str(datetime.timedelta(seconds=int(remaining)))
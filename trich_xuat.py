@@ -0,0 +1,58 @@
+import fitz  # PyMuPDF
+
+# =====================================================================================
+# TRÍCH XUẤT VĂN BẢN GỌN CHO CHẾ ĐỘ CẤU TRÚC
+# get_text("dict") mặc định kèm cả khối ảnh với dữ liệu nhị phân; ở đây chỉ yêu cầu chữ.
+# Mỗi span chỉ giữ lại những gì cần để vẽ lại (khung, font, cỡ chữ, màu) cùng mã số của
+# chuỗi chữ trong bảng khử trùng lặp, nên tài liệu lặp lại nhiều tiêu đề/chân trang
+# chỉ lưu mỗi chuỗi một lần.
+# =====================================================================================
+
+TEXT_ONLY_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+
+class SpanRecord:
+    __slots__ = ("bbox", "font", "size", "color", "text_id")
+
+    def __init__(self, bbox, font, size, color, text_id):
+        self.bbox = bbox
+        self.font = font
+        self.size = size
+        self.color = color
+        self.text_id = text_id
+
+
+class TextTable:
+    """Bảng khử trùng lặp: mỗi chuỗi chữ (đã strip) có một mã số nguyên duy nhất."""
+
+    def __init__(self):
+        self.texts = []
+        self._ids = {}
+
+    def add(self, text):
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = self._ids[text] = len(self.texts)
+            self.texts.append(text)
+        return text_id
+
+    def __len__(self):
+        return len(self.texts)
+
+
+def extract_page_spans(page, table):
+    """Trả về danh sách SpanRecord của các span có chữ trên trang, chuỗi chữ được đưa vào `table`."""
+    records = []
+    for block in page.get_text("dict", flags=TEXT_ONLY_FLAGS)["blocks"]:
+        for line in block.get("lines", ()):
+            for span in line["spans"]:
+                text = span["text"].strip()
+                if text: records.append(SpanRecord(tuple(span["bbox"]), span["font"], span["size"], span["color"], table.add(text)))
+    return records
+
+
+def iter_page_windows(pages, window):
+    """Chia danh sách trang thành các cửa sổ liên tiếp tối đa `window` trang."""
+    pages = list(pages)
+    for start in range(0, len(pages), max(1, window)):
+        yield start, pages[start:start + window]
@@ -0,0 +1,112 @@
+from functools import lru_cache
+from PIL import ImageFont
+
+# =====================================================================================
+# VẼ CHỮ ĐÃ DỊCH LÊN ẢNH TRANG (CHẾ ĐỘ TRỰC QUAN)
+# Mở và phân tích file TrueType tốn kém hơn nhiều so với vẽ glyph, nên mỗi tiến trình
+# giữ một bộ nhớ đệm font theo (đường dẫn, cỡ chữ), có giới hạn kiểu LRU.
+# Cỡ chữ vừa hộp được tìm bằng tìm kiếm nhị phân; độ rộng từng từ được ghi nhớ theo
+# font nên việc ngắt dòng không phải đo lại, và bố cục cuối cùng được dùng luôn để vẽ.
+# =====================================================================================
+
+FONT_CACHE_SIZE = 128       # số (font, cỡ chữ) tối đa giữ trong bộ nhớ mỗi tiến trình
+PRELOAD_FONT_SIZES = range(6, 41)  # cỡ chữ hay gặp ở 150-300 DPI, nạp sẵn khi worker khởi động
+MIN_FONT_SIZE = 6
+FALLBACK_FONT_SIZE = 8      # cỡ chữ cho bản rút gọn "..." khi không cỡ nào vừa hộp
+MAX_FONT_SCALE = 0.9        # cỡ chữ lớn nhất = 90% chiều cao hộp
+MAX_CACHED_WORDS = 20000    # giới hạn số từ ghi nhớ độ rộng cho mỗi font
+FIT_CACHE_SIZE = 4096       # số bố cục (chữ, kích thước hộp) ghi nhớ, có ích cho tiêu đề/chân trang lặp lại
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(font_path, size):
+    """Trả về font đã nạp cho (đường dẫn, cỡ chữ); font mặc định nếu không mở được file."""
+    try:
+        return ImageFont.truetype(font_path, size=max(1, int(size)))
+    except (IOError, TypeError):
+        return ImageFont.load_default()
+
+
+def preload_fonts(font_path, sizes=PRELOAD_FONT_SIZES):
+    """Nạp sẵn các cỡ chữ thường dùng, gọi một lần trong initializer của mỗi worker."""
+    for size in sizes: get_font(font_path, size)
+
+
+def font_cache_info():
+    return get_font.cache_info()
+
+
+class FontMetrics:
+    """Số đo của một font: chiều cao dòng, độ rộng dấu cách và độ rộng từng từ (ghi nhớ)."""
+
+    def __init__(self, font):
+        self.font = font
+        try:
+            ascent, descent = font.getmetrics()
+            self.line_height = ascent + descent
+        except AttributeError:  # font bitmap mặc định không có getmetrics
+            bbox = font.getbbox("Ag")
+            self.line_height = bbox[3] - bbox[1]
+        self.space = font.getlength(" ")
+        self._widths = {}
+
+    def width(self, word):
+        width = self._widths.get(word)
+        if width is None:
+            if len(self._widths) >= MAX_CACHED_WORDS: self._widths.clear()
+            width = self._widths[word] = self.font.getlength(word)
+        return width
+
+    def wrap(self, words, max_width):
+        """Ngắt dòng tham lam theo độ rộng đã ghi nhớ; một từ dài hơn hộp vẫn nằm riêng một dòng."""
+        lines, current, current_width = [], [words[0]], self.width(words[0])
+        for word in words[1:]:
+            word_width = self.width(word)
+            if current_width + self.space + word_width <= max_width:
+                current.append(word)
+                current_width += self.space + word_width
+            else:
+                lines.append(" ".join(current))
+                current, current_width = [word], word_width
+        lines.append(" ".join(current))
+        return lines
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_metrics(font_path, size):
+    return FontMetrics(get_font(font_path, size))
+
+
+@lru_cache(maxsize=FIT_CACHE_SIZE)
+def fit_text(text, font_path, w, h, max_scale=MAX_FONT_SCALE):
+    """
+    Tìm cỡ chữ lớn nhất để `text` ngắt dòng vừa chiều cao hộp (w, h).
+    Trả về (cỡ chữ, các dòng, chiều cao dòng) hoặc None nếu không cỡ nào vừa.
+    """
+    words = text.split()
+    if not words: return None
+    best, low, high = None, MIN_FONT_SIZE, int(h * max_scale)
+    # Số dòng chỉ giảm khi cỡ chữ giảm, nên "vừa hộp" đơn điệu theo cỡ chữ
+    while low <= high:
+        size = (low + high) // 2
+        metrics = get_metrics(font_path, size)
+        lines = metrics.wrap(words, w)
+        if len(lines) * metrics.line_height <= h:
+            best, low = (size, tuple(lines), metrics.line_height), size + 1
+        else:
+            high = size - 1
+    return best
+
+
+def draw_text_with_wrapping(draw, text, box, font_path):
+    """Vẽ bản dịch vào hộp với cỡ chữ lớn nhất vừa hộp; không vừa thì vẽ bản rút gọn."""
+    x, y, w, h = box
+    layout = fit_text(text, font_path, w, h)
+    if layout is None:
+        if text.strip(): draw.text((x, y), text[:20] + "...", font=get_font(font_path, FALLBACK_FONT_SIZE), fill='black')
+        return
+    size, lines, line_height = layout
+    font = get_font(font_path, size)
+    for line in lines:
+        draw.text((x, y), line, font=font, fill='black')
+        y += line_height